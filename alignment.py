@@ -0,0 +1,376 @@
+import bisect
+
+# Segments shorter than this (both sides together, in words) go straight to the diff
+ANCHOR_MIN_WORDS = 32
+ANCHOR_MAX_DEPTH = 8
+# Longer segments without anchors are diffed in windows of this many words per side
+DIFF_WINDOW = 64
+# How far a block may be moved along one side when evening out the gaps around it
+BALANCE_WINDOW = 4
+
+
+def _intern(a, b):
+    """Map each distinct word to a small integer so the diff compares ints instead of strings."""
+    ids = {}
+    return [ids.setdefault(word, len(ids)) for word in a], [ids.setdefault(word, len(ids)) for word in b]
+
+
+def _myers_matches(a, b, a_offset, b_offset):
+    """
+    Myers' greedy O((N+M)D) diff of a and b. Returns the matching diagonal runs
+    (i, j, size) in order, shifted by the given offsets.
+    """
+    n, m = len(a), len(b)
+    if n == 0 or m == 0:
+        return []
+    max_d = n + m
+    v = {1: 0}
+    trace = []
+    for d in range(max_d + 1):
+        trace.append(v.copy())
+        for k in range(-d, d + 1, 2):
+            # Step down (insertion) from diagonal k+1 or right (deletion) from k-1, preferring the further reach
+            if k == -d or (k != d and v[k - 1] < v[k + 1]):
+                x = v[k + 1]
+            else:
+                x = v[k - 1] + 1
+            y = x - k
+            while x < n and y < m and a[x] == b[y]:
+                x += 1
+                y += 1
+            v[k] = x
+            if x >= n and y >= m:
+                return _backtrack(trace, n, d, k, a_offset, b_offset)
+    return []
+
+
+def _backtrack(trace, n, d_end, k_end, a_offset, b_offset):
+    """Walk the recorded frontiers back from (n, m) and collect each snake's matching run."""
+    runs = []
+    x, k = n, k_end
+    for d in range(d_end, 0, -1):
+        previous = trace[d]
+        if k == -d or (k != d and previous[k - 1] < previous[k + 1]):
+            previous_k = k + 1
+            previous_x = previous[previous_k]
+            snake_x = previous_x
+        else:
+            previous_k = k - 1
+            previous_x = previous[previous_k]
+            snake_x = previous_x + 1
+        if x > snake_x:
+            runs.append((snake_x + a_offset, snake_x - k + b_offset, x - snake_x))
+        x, k = previous_x, previous_k
+    if x > 0:
+        runs.append((a_offset, b_offset, x))
+    runs.reverse()
+    return runs
+
+
+def _unique_anchors(a, b, a_lo, a_hi, b_lo, b_hi):
+    """
+    Words occurring exactly once in each of a[a_lo:a_hi] and b[b_lo:b_hi], paired up and cut
+    down to the longest run whose positions increase on both sides (patience sorting).
+    """
+    a_count, b_count, b_position = {}, {}, {}
+    for i in range(a_lo, a_hi):
+        a_count[a[i]] = a_count.get(a[i], 0) + 1
+    for j in range(b_lo, b_hi):
+        b_count[b[j]] = b_count.get(b[j], 0) + 1
+        b_position[b[j]] = j
+    pairs = [(i, b_position[a[i]]) for i in range(a_lo, a_hi) if a_count[a[i]] == 1 and b_count.get(a[i]) == 1]
+
+    tails = []  # tails[k]: index into pairs of the smallest j ending an increasing run of length k + 1
+    tail_js = []
+    previous = [None] * len(pairs)
+    for index, (_, j) in enumerate(pairs):
+        k = bisect.bisect_left(tail_js, j)
+        if k:
+            previous[index] = tails[k - 1]
+        if k == len(tails):
+            tails.append(index)
+            tail_js.append(j)
+        else:
+            tails[k] = index
+            tail_js[k] = j
+    anchors = []
+    index = tails[-1] if tails else None
+    while index is not None:
+        anchors.append(pairs[index])
+        index = previous[index]
+    anchors.reverse()
+    return anchors
+
+
+def _windowed_matches(a, b, a_lo, a_hi, b_lo, b_hi, runs):
+    """
+    Diff a long segment window by window: only the matches starting in the first half of each
+    window are kept before it moves on, so a segment with no unique words to anchor on (a
+    paragraph repeating a sentence, say) still costs time linear in its length.
+    """
+    half = DIFF_WINDOW // 2
+    while (a_hi - a_lo) + (b_hi - b_lo) > 2 * DIFF_WINDOW:
+        a_end, b_end = min(a_hi, a_lo + DIFF_WINDOW), min(b_hi, b_lo + DIFF_WINDOW)
+        window = _myers_matches(a[a_lo:a_end], b[b_lo:b_end], a_lo, b_lo)
+        kept = [(i, j, min(size, a_lo + half - i)) for i, j, size in window if i < a_lo + half]
+        if kept:
+            runs.extend(kept)
+            i, j, size = kept[-1]
+            a_lo, b_lo = i + size, j + size
+        elif window:
+            a_lo, b_lo = window[0][0], window[0][1]
+        else:
+            a_lo, b_lo = min(a_hi, a_lo + half), min(b_hi, b_lo + half)
+    runs.extend(_myers_matches(a[a_lo:a_hi], b[b_lo:b_hi], a_lo, b_lo))
+
+
+def _match_runs(a, b, a_lo, a_hi, b_lo, b_hi, runs, depth=0):
+    """
+    Append the matching runs of a[a_lo:a_hi] and b[b_lo:b_hi] to runs, in order. The common
+    prefix and suffix are matched directly; long middles are split at unique words first so
+    each diff only sees the few edits between two anchors.
+    """
+    prefix = 0
+    while a_lo + prefix < a_hi and b_lo + prefix < b_hi and a[a_lo + prefix] == b[b_lo + prefix]:
+        prefix += 1
+    suffix = 0
+    while a_lo + prefix < a_hi - suffix and b_lo + prefix < b_hi - suffix and a[a_hi - 1 - suffix] == b[b_hi - 1 - suffix]:
+        suffix += 1
+    if prefix:
+        runs.append((a_lo, b_lo, prefix))
+    a_lo, b_lo, a_hi, b_hi = a_lo + prefix, b_lo + prefix, a_hi - suffix, b_hi - suffix
+
+    if a_lo < a_hi and b_lo < b_hi:
+        anchors = []
+        if (a_hi - a_lo) + (b_hi - b_lo) >= ANCHOR_MIN_WORDS and depth < ANCHOR_MAX_DEPTH:
+            anchors = _unique_anchors(a, b, a_lo, a_hi, b_lo, b_hi)
+        if anchors:
+            for i, j in anchors:
+                _match_runs(a, b, a_lo, i, b_lo, j, runs, depth + 1)
+                runs.append((i, j, 1))
+                a_lo, b_lo = i + 1, j + 1
+            _match_runs(a, b, a_lo, a_hi, b_lo, b_hi, runs, depth + 1)
+        else:
+            _windowed_matches(a, b, a_lo, a_hi, b_lo, b_hi, runs)
+
+    if suffix:
+        runs.append((a_hi, b_hi, suffix))
+
+
+def _changed_flags(n, m, runs):
+    """Per-word change flags for both sides, with a trailing False sentinel."""
+    a_changed = [True] * n + [False]
+    b_changed = [True] * m + [False]
+    for i, j, size in runs:
+        a_changed[i:i + size] = [False] * size
+        b_changed[j:j + size] = [False] * size
+    return a_changed, b_changed
+
+
+def _compact(words, changed, other_changed):
+    """
+    Slide each run of changed words along equal neighbours (as git's diff does): down as far
+    as possible, or back to where it lines up with a change on the other side so a deletion
+    and an insertion become one replacement. Ties between equally short diffs around repeated
+    words are settled this way instead of by which edit the diff happened to find first.
+    """
+    n = len(words)
+    start = end = 0
+    other_start = other_end = 0
+    while other_changed[other_end]:
+        other_end += 1
+
+    def slide_up():
+        nonlocal start, end
+        if start > 0 and words[start - 1] == words[end - 1]:
+            start -= 1
+            end -= 1
+            changed[start] = True
+            changed[end] = False
+            while start > 0 and changed[start - 1]:
+                start -= 1
+            return True
+        return False
+
+    def slide_down():
+        nonlocal start, end
+        if end < n and words[start] == words[end]:
+            changed[start] = False
+            changed[end] = True
+            start += 1
+            end += 1
+            while changed[end]:
+                end += 1
+            return True
+        return False
+
+    def other_previous():
+        nonlocal other_start, other_end
+        other_end = other_start - 1
+        other_start = other_end
+        while other_start > 0 and other_changed[other_start - 1]:
+            other_start -= 1
+
+    def other_next():
+        nonlocal other_start, other_end
+        other_start = other_end + 1
+        other_end = other_start
+        while other_changed[other_end]:
+            other_end += 1
+
+    while True:
+        while changed[end]:
+            end += 1
+        if end != start:
+            while True:
+                size = end - start
+                end_matching_other = -1
+                while slide_up():
+                    other_previous()
+                earliest_end = end
+                if other_end > other_start:
+                    end_matching_other = end
+                while slide_down():
+                    other_next()
+                    if other_end > other_start:
+                        end_matching_other = end
+                if size == end - start:
+                    break
+            if end != earliest_end and end_matching_other != -1:
+                while other_end == other_start:
+                    slide_up()
+                    other_previous()
+        if end >= n:
+            break
+        start = end = end + 1
+        other_next()
+
+
+def matching_blocks(a, b):
+    """
+    Matching blocks of word lists a and b in the same (i, j, size) form as
+    difflib.SequenceMatcher.get_matching_blocks, ending with the (len(a), len(b), 0) sentinel.
+    """
+    a_ids, b_ids = _intern(a, b)
+    n, m = len(a_ids), len(b_ids)
+
+    runs = []
+    _match_runs(a_ids, b_ids, 0, n, 0, m, runs)
+
+    a_changed, b_changed = _changed_flags(n, m, runs)
+    _compact(a_ids, a_changed, b_changed)
+    _compact(b_ids, b_changed, a_changed)
+
+    # Unchanged words pair up in order; each unbroken stretch of them is one block
+    blocks = []
+    i = j = 0
+    while i < n and j < m:
+        if a_changed[i]:
+            i += 1
+        elif b_changed[j]:
+            j += 1
+        else:
+            size = 0
+            while i + size < n and j + size < m and not a_changed[i + size] and not b_changed[j + size]:
+                size += 1
+            blocks.append((i, j, size))
+            i += size
+            j += size
+    blocks = _balance_gaps(a_ids, b_ids, blocks)
+    _favour_longer_blocks(a_ids, b_ids, blocks)
+    blocks.append((n, m, 0))
+    return blocks
+
+
+def _balance_gaps(a, b, blocks):
+    """
+    Move a block a few words along one side when it matches there too and that evens out the
+    gaps on either side of it, so "X w Y" -> "X' w w" aligns as two one-for-one replacements
+    (as SequenceMatcher gives, and as detect_errors pairs words) rather than a two-word
+    replacement and a deletion. Blocks left touching are merged.
+    """
+    n, m = len(a), len(b)
+    for position, (i, j, size) in enumerate(blocks):
+        previous_i = previous_j = 0
+        if position:
+            last_i, last_j, last_size = blocks[position - 1]
+            previous_i, previous_j = last_i + last_size, last_j + last_size
+        next_i, next_j = (n, m) if position == len(blocks) - 1 else blocks[position + 1][:2]
+
+        def imbalance(block_i, block_j):
+            before = (block_i - previous_i) - (block_j - previous_j)
+            after = (next_i - block_i) - (next_j - block_j)
+            return abs(before) + abs(after)
+
+        best, best_cost = (i, j), imbalance(i, j)
+        if not best_cost:
+            continue
+        for delta in range(-BALANCE_WINDOW, BALANCE_WINDOW + 1):
+            if not delta:
+                continue
+            for block_i, block_j in ((i + delta, j), (i, j + delta)):
+                if not (previous_i <= block_i <= next_i - size and previous_j <= block_j <= next_j - size):
+                    continue
+                cost = imbalance(block_i, block_j)
+                if cost < best_cost and a[block_i:block_i + size] == b[block_j:block_j + size]:
+                    best, best_cost = (block_i, block_j), cost
+        blocks[position] = best + (size,)
+
+    merged = []
+    for i, j, size in blocks:
+        if merged and merged[-1][0] + merged[-1][2] == i and merged[-1][1] + merged[-1][2] == j:
+            last_i, last_j, last_size = merged.pop()
+            merged.append((last_i, last_j, last_size + size))
+        else:
+            merged.append((i, j, size))
+    return merged
+
+
+def _favour_longer_blocks(a, b, blocks):
+    """
+    A lone insertion or deletion of words repeated around it can sit at either end of the
+    repeat. Compaction leaves it at the far end; move it to the near end when that makes the
+    following block the longer one, matching SequenceMatcher's longest-block-first choice.
+    """
+    for position in range(len(blocks) - 1, 0, -1):
+        (i1, j1, size1), (i2, j2, size2) = blocks[position - 1], blocks[position]
+        if i1 + size1 == i2:
+            gap, gap_end, before = b, j2, j1 + size1
+        elif j1 + size1 == j2:
+            gap, gap_end, before = a, i2, i1 + size1
+        else:
+            continue
+        # A block emptied by the shift would join this gap to the previous one
+        limit = size1 if i1 == 0 and j1 == 0 else size1 - 1
+        shift = 0
+        while shift < limit and gap[before - 1 - shift] == gap[gap_end - 1 - shift]:
+            shift += 1
+        if shift and size2 + shift > size1:
+            blocks[position] = (i2 - shift, j2 - shift, size2 + shift)
+            if size1 == shift:
+                del blocks[position - 1]
+            else:
+                blocks[position - 1] = (i1, j1, size1 - shift)
+
+
+def iter_opcodes(a, b):
+    """
+    Yield (tag, i1, i2, j1, j2) opcodes turning a into b, with the same 'equal', 'replace',
+    'delete' and 'insert' semantics as difflib.SequenceMatcher.get_opcodes.
+    """
+    i = j = 0
+    for block_i, block_j, size in matching_blocks(a, b):
+        if i < block_i and j < block_j:
+            yield ('replace', i, block_i, j, block_j)
+        elif i < block_i:
+            yield ('delete', i, block_i, j, block_j)
+        elif j < block_j:
+            yield ('insert', i, block_i, j, block_j)
+        i, j = block_i + size, block_j + size
+        if size:
+            yield ('equal', block_i, i, block_j, j)
+
+
+def get_opcodes(a, b):
+    """List form of iter_opcodes."""
+    return list(iter_opcodes(a, b))
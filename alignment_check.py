@@ -0,0 +1,92 @@
+"""
+Check the word aligner used by detect_errors against difflib.SequenceMatcher and time it.
+Every corpus row holds an input text, its correction and the opcodes expected from the aligner.
+Each row is also aligned with SequenceMatcher, as detect_errors did before, and must give the
+same opcodes unless the row lists SequenceMatcher's differing opcodes under "difflib_opcodes"
+(known cases where SequenceMatcher misaligned the words). Exits non-zero when any row's opcodes
+change or SequenceMatcher disagrees on a row that does not list the difference.
+
+Usage: python alignment_check.py [--corpus alignment_corpus.jsonl] [--sizes 50,200,800,3200]
+"""
+import argparse
+import json
+import random
+import re
+import sys
+import time
+from difflib import SequenceMatcher
+
+from alignment import get_opcodes
+
+
+def read_corpus(path):
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def words(text):
+    return re.findall(r'\S+', text)
+
+
+def seconds_per_call(align, pairs):
+    start = time.perf_counter()
+    for input_words, corrected_words in pairs:
+        align(input_words, corrected_words)
+    return (time.perf_counter() - start) / len(pairs)
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--corpus", default="alignment_corpus.jsonl")
+    parser.add_argument("--sizes", default="50,200,800,3200", help="paragraph lengths in words to time")
+    args = parser.parse_args()
+
+    rows = read_corpus(args.corpus)
+    changed = []
+    diverged = []
+    difflib_same = 0
+    for number, row in enumerate(rows, 1):
+        input_words, corrected_words = words(row["input_text"]), words(row["corrected_text"])
+        opcodes = [list(opcode) for opcode in get_opcodes(input_words, corrected_words)]
+        difflib_opcodes = [list(opcode) for opcode in SequenceMatcher(None, input_words, corrected_words).get_opcodes()]
+        if opcodes != row["opcodes"]:
+            changed.append((number, row, opcodes))
+        if difflib_opcodes == opcodes:
+            difflib_same += 1
+        if difflib_opcodes != row.get("difflib_opcodes", opcodes):
+            diverged.append((number, opcodes, difflib_opcodes))
+
+    print(f"{len(rows)} corpus rows, {len(rows) - len(changed)} with the expected opcodes")
+    print(f"  difflib.SequenceMatcher gives the same opcodes on {difflib_same} of them, "
+          f"{len(diverged)} unlisted differences")
+    for number, row, opcodes in changed[:20]:
+        print(f"  - row {number} changed:\n      expected: {row['opcodes']}\n      got:      {opcodes}")
+    for number, opcodes, difflib_opcodes in diverged[:20]:
+        print(f"  - row {number} differs from SequenceMatcher:\n      aligner:         {opcodes}\n"
+              f"      SequenceMatcher: {difflib_opcodes}")
+
+    # Paragraphs of growing length, built from corpus rows, to show time per word stays flat
+    rng = random.Random(0)
+    print("paragraph words   aligner us/word   SequenceMatcher us/word   (autojunk=False)")
+    for size in [int(size) for size in args.sizes.split(",")]:
+        pairs = []
+        for _ in range(max(3, 2000 // size)):
+            input_words, corrected_words = [], []
+            while len(input_words) < size:
+                row = rng.choice(rows)
+                input_words += words(row["input_text"])
+                corrected_words += words(row["corrected_text"])
+            pairs.append((input_words, corrected_words))
+        timings = [
+            seconds_per_call(get_opcodes, pairs),
+            seconds_per_call(lambda a, b: SequenceMatcher(None, a, b).get_opcodes(), pairs),
+            seconds_per_call(lambda a, b: SequenceMatcher(None, a, b, autojunk=False).get_opcodes(), pairs),
+        ]
+        length = len(pairs[0][0])
+        print(f"{length:>15} {timings[0] / length * 1e6:>17.2f} {timings[1] / length * 1e6:>25.2f} {timings[2] / length * 1e6:>18.2f}")
+
+    sys.exit(1 if changed or diverged else 0)
+
+
+if __name__ == "__main__":
+    main_cli()
@@ -0,0 +1,35 @@
+import logging
+
+import torch
+
+logger = logging.getLogger("urdu_correct")
+
+# fp32: eager PyTorch as loaded; int8: dynamic quantization of the Linear layers;
+# bf16: bfloat16 weights and activations where the CPU supports them
+BACKENDS = ("fp32", "int8", "bf16")
+
+
+def bf16_supported():
+    """Check whether this CPU has native bfloat16 kernels (AVX512-BF16 / AMX)."""
+    try:
+        return torch.backends.mkldnn.is_available() and torch.ops.mkldnn._is_mkldnn_bf16_supported()
+    except (AttributeError, RuntimeError):
+        return False
+
+
+def apply_backend(model, backend):
+    """
+    Prepare a loaded model for CPU inference with the given backend.
+    Falls back to fp32 when bf16 is requested on a CPU without bf16 support.
+    """
+    model.eval()
+    if backend == "fp32":
+        return model
+    if backend == "int8":
+        return torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+    if backend == "bf16":
+        if not bf16_supported():
+            logger.warning("bf16 is not supported on this CPU, keeping fp32 weights.")
+            return model
+        return model.to(torch.bfloat16)
+    raise ValueError(f"Unknown inference backend '{backend}', expected one of {', '.join(BACKENDS)}")
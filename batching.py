@@ -0,0 +1,206 @@
+import asyncio
+import contextlib
+import time
+
+
+class QueueFullError(Exception):
+    """Raised when a model's request queue is full and new work must be rejected."""
+
+
+class MicroBatcher:
+    """
+    Collects concurrent requests for one model and runs them through a single batched call.
+    A worker waits up to `max_wait_ms` after the first queued request for more to arrive,
+    then hands at most `max_batch_size` items to `process_batch` and returns each caller its result.
+
+    `process_batch` runs on `executor` so the event loop stays free while the model works.
+    At most `concurrency` batches per model are in flight, and a submission raises QueueFullError
+    when the queue already holds `max_queue_size` items. An admitted submission larger than the
+    room left in the queue keeps that many of its items queued or in flight and feeds in the rest
+    as their results come back, so the queue stays within its bound.
+    """
+
+    def __init__(self, name, process_batch, max_batch_size=8, max_wait_ms=10,
+                 executor=None, concurrency=1, max_queue_size=0):
+        self.name = name
+        self.process_batch = process_batch
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait = max(0, max_wait_ms) / 1000
+        self.executor = executor
+        self.concurrency = max(1, concurrency)
+        self.max_queue_size = max(0, max_queue_size)
+        self.queue = None
+        self.workers = []
+        self.rejected = 0
+
+        # Counters used to tune the batching window
+        self.total_batches = 0
+        self.total_requests = 0
+        self.batch_size_counts = {}
+        self.total_queue_wait = 0.0
+        self.max_queue_wait = 0.0
+
+    def _ensure_workers(self):
+        # The queue and workers must belong to the loop that serves requests, so create them on first use
+        if not self.workers or all(worker.done() for worker in self.workers):
+            loop = asyncio.get_running_loop()
+            self.queue = asyncio.Queue()
+            self.workers = [loop.create_task(self._run()) for _ in range(self.concurrency)]
+
+    def _admit(self, count):
+        """Return how many of `count` items may be queued now, or raise QueueFullError if there is no room."""
+        if not self.max_queue_size:
+            return count
+        waiting = self.queue.qsize()
+        if waiting >= self.max_queue_size:
+            self.rejected += 1
+            raise QueueFullError(f"{self.name} queue is full ({waiting} waiting, limit {self.max_queue_size})")
+        return min(count, self.max_queue_size - waiting)
+
+    async def submit(self, item):
+        """Queue one item and wait for its result from the next batch."""
+        results = await self.submit_many([item])
+        return results[0]
+
+    async def submit_many(self, items):
+        """
+        Queue several items back to back so they land in the same batches, and wait for all results.
+        The items are admitted together: QueueFullError is raised before any is queued, or all are
+        processed, those beyond the room left in the queue as earlier ones finish.
+        """
+        if not items:
+            return []
+        self._ensure_workers()
+        window = self._admit(len(items))
+        loop = asyncio.get_running_loop()
+        enqueued_at = time.perf_counter()
+        entries = [(item, loop.create_future()) for item in items]
+        for item, future in entries[:window]:
+            self.queue.put_nowait((item, future, enqueued_at))
+        futures = [future for _, future in entries]
+        if window == len(entries):
+            return await asyncio.gather(*futures)
+        results = await asyncio.gather(self._feed(entries, window), *futures)
+        return results[1:]
+
+    async def _feed(self, entries, window):
+        # Queue the items beyond the first `window` one at a time as outstanding ones finish
+        outstanding = {future for _, future in entries[:window]}
+        for item, future in entries[window:]:
+            while len(outstanding) >= window:
+                done, outstanding = await asyncio.wait(outstanding, return_when=asyncio.FIRST_COMPLETED)
+                if any(finished.cancelled() or finished.exception() is not None for finished in done):
+                    # The submission has failed; leave the rest unqueued
+                    return
+            self.queue.put_nowait((item, future, time.perf_counter()))
+            outstanding.add(future)
+
+    async def _collect(self):
+        # Block for the first request, then keep gathering until the window closes or the batch is full
+        batch = [await self.queue.get()]
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self.queue.get(), remaining))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    def _record(self, batch):
+        now = time.perf_counter()
+        size = len(batch)
+        self.total_batches += 1
+        self.total_requests += size
+        self.batch_size_counts[size] = self.batch_size_counts.get(size, 0) + 1
+        for _, _, enqueued_at in batch:
+            wait = now - enqueued_at
+            self.total_queue_wait += wait
+            self.max_queue_wait = max(self.max_queue_wait, wait)
+
+    async def _run(self):
+        while True:
+            batch = await self._collect()
+            self._record(batch)
+            try:
+                results = await asyncio.get_running_loop().run_in_executor(
+                    self.executor, self.process_batch, [item for item, _, _ in batch]
+                )
+            except Exception as exc:
+                for _, future, _ in batch:
+                    if not future.done():
+                        future.set_exception(exc)
+                continue
+            for (_, future, _), result in zip(batch, results):
+                # A caller may have disconnected and cancelled its future while the batch ran
+                if not future.done():
+                    future.set_result(result)
+
+    def stats(self):
+        """Return batch size and queue wait statistics for this model."""
+        return {
+            "max_batch_size": self.max_batch_size,
+            "window_ms": self.max_wait * 1000,
+            "concurrency": self.concurrency,
+            "max_queue_size": self.max_queue_size,
+            "batches": self.total_batches,
+            "requests": self.total_requests,
+            "avg_batch_size": self.total_requests / self.total_batches if self.total_batches else 0.0,
+            "batch_size_counts": dict(sorted(self.batch_size_counts.items())),
+            "avg_queue_wait_ms": 1000 * self.total_queue_wait / self.total_requests if self.total_requests else 0.0,
+            "max_queue_wait_ms": 1000 * self.max_queue_wait,
+            "queue_depth": self.queue.qsize() if self.queue is not None else 0,
+            "rejected": self.rejected,
+        }
+
+
+class StreamSlots:
+    """
+    Admission for one model's streamed generations, which run one text at a time outside the
+    micro-batcher. At most `concurrency` streams generate at once and up to `max_queue_size`
+    more wait for a slot; beyond that `slot()` raises QueueFullError.
+    """
+
+    def __init__(self, name, concurrency=1, max_queue_size=0):
+        self.name = name
+        self.concurrency = max(1, concurrency)
+        self.max_queue_size = max(0, max_queue_size)
+        self.semaphore = None
+        self.active = 0
+        self.waiting = 0
+        self.streams = 0
+        self.rejected = 0
+
+    @contextlib.asynccontextmanager
+    async def slot(self):
+        """Hold one of the model's stream slots for the duration of the block."""
+        if self.semaphore is None:
+            self.semaphore = asyncio.Semaphore(self.concurrency)
+        if self.max_queue_size and self.waiting >= self.max_queue_size:
+            self.rejected += 1
+            raise QueueFullError(f"{self.name} stream queue is full ({self.waiting} waiting)")
+        self.waiting += 1
+        try:
+            await self.semaphore.acquire()
+        finally:
+            self.waiting -= 1
+        self.active += 1
+        self.streams += 1
+        try:
+            yield
+        finally:
+            self.active -= 1
+            self.semaphore.release()
+
+    def stats(self):
+        return {
+            "concurrency": self.concurrency,
+            "max_queue_size": self.max_queue_size,
+            "active": self.active,
+            "waiting": self.waiting,
+            "streams": self.streams,
+            "rejected": self.rejected,
+        }
@@ -0,0 +1,93 @@
+"""
+Microbenchmark detect_errors across input sizes.
+Paragraphs of each size are stitched together from the realistic correction pairs in
+alignment_corpus.jsonl, and each is timed for the full detect_errors call and for the word
+alignment on its own, so a regression can be pinned on either the aligner or the lexicon checks.
+
+Usage: python -m benchmarks.detect_errors_bench [--sizes 10,50,200,800,3200] [--min-time 0.5] [--json OUT]
+"""
+import argparse
+import json
+import os
+import random
+import re
+import time
+
+os.environ.setdefault("LOG_LEVEL", "WARNING")
+
+import main
+from alignment import get_opcodes
+
+DEFAULT_CORPUS = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "alignment_corpus.jsonl")
+
+
+def build_pairs(rows, size, count, rng):
+    """`count` (input_text, corrected_text) paragraphs of at least `size` words."""
+    pairs = []
+    for _ in range(count):
+        input_texts, corrected_texts, words = [], [], 0
+        while words < size:
+            row = rng.choice(rows)
+            input_texts.append(row["input_text"])
+            corrected_texts.append(row["corrected_text"])
+            words += len(row["input_text"].split())
+        pairs.append((" ".join(input_texts), " ".join(corrected_texts)))
+    return pairs
+
+
+def time_per_call(function, pairs, min_time):
+    """Mean seconds per call, running over the pairs as many times as needed to fill min_time."""
+    calls = 0
+    start = time.perf_counter()
+    while True:
+        for input_text, corrected_text in pairs:
+            function(input_text, corrected_text)
+        calls += len(pairs)
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_time:
+            return elapsed / calls
+
+
+def align(input_text, corrected_text):
+    return get_opcodes(re.findall(r'\S+', input_text), re.findall(r'\S+', corrected_text))
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--corpus", default=DEFAULT_CORPUS)
+    parser.add_argument("--sizes", default="10,50,200,800,3200", help="paragraph lengths in words")
+    parser.add_argument("--min-time", type=float, default=0.5, help="seconds to spend timing each size")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", help="also write the results to this file")
+    args = parser.parse_args()
+
+    with open(args.corpus, encoding="utf-8") as f:
+        rows = [json.loads(line) for line in f if line.strip()]
+    rng = random.Random(args.seed)
+
+    results = []
+    print(f"{'words':>7}{'errors':>8}{'detect_errors ms':>18}{'us/word':>9}{'alignment ms':>14}{'us/word':>9}")
+    for size in [int(size) for size in args.sizes.split(",")]:
+        pairs = build_pairs(rows, size, max(3, 2000 // size), rng)
+        words = sum(len(input_text.split()) for input_text, _ in pairs) / len(pairs)
+        errors = sum(len(main.detect_errors(*pair)) for pair in pairs) / len(pairs)
+        detect_seconds = time_per_call(main.detect_errors, pairs, args.min_time)
+        align_seconds = time_per_call(align, pairs, args.min_time)
+        results.append({
+            "words": words,
+            "errors": errors,
+            "detect_errors_ms": detect_seconds * 1000,
+            "alignment_ms": align_seconds * 1000,
+        })
+        print(
+            f"{words:>7.0f}{errors:>8.1f}{detect_seconds * 1000:>18.3f}{detect_seconds / words * 1e6:>9.2f}"
+            f"{align_seconds * 1000:>14.3f}{align_seconds / words * 1e6:>9.2f}"
+        )
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"sizes": results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main_cli()
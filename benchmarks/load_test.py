@@ -0,0 +1,150 @@
+"""
+Replay a JSONL workload against the service in-process and report latency per endpoint.
+Requests go through the FastAPI app over an in-memory transport, so the numbers cover
+routing, batching, caching, generation and error detection but not the network. By default
+the models are tiny random stand-ins (benchmarks/tiny_models.py), so it runs offline.
+
+The service reads its usual environment variables (BATCH_MAX_SIZE, CACHE_MAX_ENTRIES,
+MT5_SENTENCE_BACKEND, ...), so a change is measured by running this twice with different
+settings; set CACHE_MAX_ENTRIES=0 to keep repeated requests from being served from the cache.
+
+Usage: python -m benchmarks.load_test [--workload FILE] [--concurrency 8] [--repeat 3] [--json OUT]
+Each workload line is {"endpoint": "/mt5_sentence", "body": {...}}; a line with just an
+"input_text" field goes to --endpoint.
+"""
+import argparse
+import asyncio
+import json
+import math
+import os
+import time
+
+os.environ.setdefault("LOG_LEVEL", "WARNING")
+
+import httpx
+
+import main
+from benchmarks import tiny_models
+
+DEFAULT_WORKLOAD = os.path.join(os.path.dirname(os.path.abspath(__file__)), "workload.jsonl")
+
+
+def read_workload(path, default_endpoint):
+    workload = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if not line.strip():
+                continue
+            entry = json.loads(line)
+            if "endpoint" in entry:
+                workload.append((entry["endpoint"], entry["body"]))
+            else:
+                workload.append((default_endpoint, entry))
+    return workload
+
+
+def percentile(sorted_values, p):
+    """Nearest-rank percentile of an already sorted list."""
+    return sorted_values[max(0, math.ceil(p / 100 * len(sorted_values)) - 1)]
+
+
+def summarize(samples, elapsed):
+    """Per-endpoint and overall counts, throughput and latency percentiles (in ms)."""
+    by_endpoint = {}
+    for endpoint, status, seconds in samples:
+        by_endpoint.setdefault(endpoint, []).append((status, seconds))
+    by_endpoint["all"] = [(status, seconds) for _, status, seconds in samples]
+
+    summary = {}
+    for endpoint, results in by_endpoint.items():
+        latencies = sorted(seconds * 1000 for _, seconds in results)
+        summary[endpoint] = {
+            "requests": len(results),
+            "errors": sum(1 for status, _ in results if status >= 400),
+            "throughput_rps": len(results) / elapsed,
+            "mean_ms": sum(latencies) / len(latencies),
+            "p50_ms": percentile(latencies, 50),
+            "p95_ms": percentile(latencies, 95),
+            "p99_ms": percentile(latencies, 99),
+            "max_ms": latencies[-1],
+        }
+    return summary
+
+
+async def replay(workload, concurrency):
+    """Send every request with at most `concurrency` in flight; return (samples, elapsed seconds, /stats)."""
+    samples = []
+    pending = iter(workload)
+
+    async def client_loop(client):
+        for endpoint, body in pending:
+            start = time.perf_counter()
+            response = await client.post(endpoint, json=body)
+            await response.aread()
+            samples.append((endpoint, response.status_code, time.perf_counter() - start))
+
+    transport = httpx.ASGITransport(app=main.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://benchmark", timeout=None) as client:
+        start = time.perf_counter()
+        await asyncio.gather(*[client_loop(client) for _ in range(concurrency)])
+        elapsed = time.perf_counter() - start
+        stats = (await client.get("/stats")).json()
+    return samples, elapsed, stats
+
+
+async def run(args):
+    await main.app.router.startup()
+    try:
+        if args.warmup:
+            # Load every model before timing so the first requests do not pay for it
+            await asyncio.get_running_loop().run_in_executor(
+                main.inference_executor, main.model_registry.warmup, main.enabled_models
+            )
+        workload = read_workload(args.workload, args.endpoint) * args.repeat
+        return await replay(workload, args.concurrency)
+    finally:
+        await main.app.router.shutdown()
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--workload", default=DEFAULT_WORKLOAD)
+    parser.add_argument("--endpoint", default="/mt5_sentence", help="endpoint for lines without one")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--repeat", type=int, default=3, help="times to replay the workload")
+    parser.add_argument("--warmup", action=argparse.BooleanOptionalAction, default=True)
+    parser.add_argument("--real-models", action="store_true", help="load the real checkpoints instead of tiny ones")
+    parser.add_argument("--json", help="also write the results to this file")
+    args = parser.parse_args()
+
+    if not args.real_models:
+        tiny_models.install()
+    samples, elapsed, stats = asyncio.run(run(args))
+    summary = summarize(samples, elapsed)
+
+    print(f"{len(samples)} requests in {elapsed:.2f}s at concurrency {args.concurrency}")
+    print(f"{'endpoint':<26}{'requests':>9}{'errors':>8}{'req/s':>9}{'mean':>9}{'p50':>9}{'p95':>9}{'p99':>9}  (ms)")
+    for endpoint, row in summary.items():
+        print(
+            f"{endpoint:<26}{row['requests']:>9}{row['errors']:>8}{row['throughput_rps']:>9.1f}"
+            f"{row['mean_ms']:>9.1f}{row['p50_ms']:>9.1f}{row['p95_ms']:>9.1f}{row['p99_ms']:>9.1f}"
+        )
+    for name, batching in stats["batching"].items():
+        print(f"  {name}: {batching['requests']} texts in {batching['batches']} batches, "
+              f"mean queue wait {batching['avg_queue_wait_ms']:.1f}ms")
+    print(f"  cache: {stats['cache']['hits']} hits, {stats['cache']['misses']} misses")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({
+                "concurrency": args.concurrency,
+                "repeat": args.repeat,
+                "tiny_models": not args.real_models,
+                "elapsed_seconds": elapsed,
+                "endpoints": summary,
+                "stats": stats,
+            }, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == "__main__":
+    main_cli()
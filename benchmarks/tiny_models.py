@@ -0,0 +1,103 @@
+"""
+Tiny randomly initialized stand-ins for the service's models, so benchmarks run offline.
+The tokenizer is a small SentencePiece model trained on the error lexicon, and the models
+keep the real architectures (MT5, mBART-50) with a couple of narrow layers. Tokenization,
+batching, generation and error detection all run as in production; the corrections are
+just not meaningful.
+"""
+import os
+import tempfile
+
+import sentencepiece as spm
+import torch
+from transformers import (
+    MBart50Tokenizer, MBart50TokenizerFast, MBartConfig, MBartForConditionalGeneration,
+    MT5Config, MT5ForConditionalGeneration, MT5Tokenizer, MT5TokenizerFast,
+)
+
+import main
+from backends import apply_backend
+from lexicon import read_sources
+from registry import LoadedModel
+
+VOCAB_SIZE = 400
+SEED = 0
+
+# Small enough to load in well under a second, large enough that generation dominates a request
+MT5_CONFIG = dict(d_model=64, d_kv=16, d_ff=128, num_layers=2, num_decoder_layers=2, num_heads=4)
+MBART_CONFIG = dict(
+    d_model=64, encoder_layers=2, decoder_layers=2, encoder_attention_heads=4, decoder_attention_heads=4,
+    encoder_ffn_dim=128, decoder_ffn_dim=128, max_position_embeddings=1024,
+)
+
+
+def lexicon_lines():
+    lines = [main.PROMPT_PREFIX]
+    for dictionary in read_sources(main.lexicon_dir):
+        for correct_word, incorrect_word in dictionary["entries"]:
+            lines += [correct_word, incorrect_word]
+        lines += [dictionary["error_type"], dictionary["reason"]]
+    return lines
+
+
+def build_tokenizers():
+    """Train the SentencePiece model and wrap it as MT5 and mBART-50 tokenizers (fast where possible)."""
+    with tempfile.TemporaryDirectory() as directory:
+        prefix = os.path.join(directory, "tiny")
+        spm.SentencePieceTrainer.train(
+            sentence_iterator=iter(lexicon_lines()), model_prefix=prefix, vocab_size=VOCAB_SIZE,
+            character_coverage=1.0, pad_id=0, eos_id=1, unk_id=2, bos_id=-1, minloglevel=2,
+        )
+        vocab_file = prefix + ".model"
+        try:
+            mt5_tokenizer = MT5TokenizerFast(vocab_file=vocab_file, extra_ids=0)
+            mbart_tokenizer = MBart50TokenizerFast(vocab_file=vocab_file)
+        except (ValueError, ImportError) as exc:
+            main.logger.warning("Fast tokenizers unavailable (%s), using the slow tokenizers.", exc)
+            mt5_tokenizer = MT5Tokenizer(vocab_file, extra_ids=0)
+            mbart_tokenizer = MBart50Tokenizer(vocab_file)
+    return mt5_tokenizer, mbart_tokenizer
+
+
+def tiny_loaders():
+    """Loaders with the same LoadedModel contract as main.MODEL_LOADERS."""
+    mt5_tokenizer, mbart_tokenizer = build_tokenizers()
+
+    def seeded(build, name):
+        with torch.random.fork_rng():
+            torch.manual_seed(SEED)
+            model = build()
+        # Same backend settings as the real loaders, so quantization changes can be measured here too
+        return apply_backend(model, main.model_backends[name])
+
+    def mt5_loader(name):
+        def load():
+            config = MT5Config(
+                vocab_size=len(mt5_tokenizer), decoder_start_token_id=mt5_tokenizer.pad_token_id,
+                pad_token_id=mt5_tokenizer.pad_token_id, eos_token_id=mt5_tokenizer.eos_token_id, **MT5_CONFIG,
+            )
+            return LoadedModel(mt5_tokenizer, seeded(lambda: MT5ForConditionalGeneration(config), name), None)
+        return load
+
+    def load_bart_paragraph():
+        config = MBartConfig(
+            vocab_size=len(mbart_tokenizer), pad_token_id=mbart_tokenizer.pad_token_id,
+            bos_token_id=mbart_tokenizer.bos_token_id, eos_token_id=mbart_tokenizer.eos_token_id,
+            decoder_start_token_id=mbart_tokenizer.eos_token_id, **MBART_CONFIG,
+        )
+        model = seeded(lambda: MBartForConditionalGeneration(config), "bart_paragraph")
+        return LoadedModel(mbart_tokenizer, model, mbart_tokenizer.lang_code_to_id["ur_PK"])
+
+    return {
+        "mt5_paragraph": mt5_loader("mt5_paragraph"),
+        "mt5_sentence": mt5_loader("mt5_sentence"),
+        "bart_paragraph": load_bart_paragraph,
+    }
+
+
+def install():
+    """Point the service's model registry at the tiny models (for the models it has enabled)."""
+    loaders = tiny_loaders()
+    main.MODEL_LOADERS.update(loaders)
+    for name in main.enabled_models:
+        main.model_registry.register(name, loaders[name])
@@ -0,0 +1,186 @@
+import asyncio
+import hashlib
+import json
+import logging
+import sqlite3
+import time
+import unicodedata
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+logger = logging.getLogger("urdu_correct")
+
+# Writes to the sqlite file between sweeps that drop expired rows and trim it to its bound
+DISK_PRUNE_EVERY = 256
+
+
+class CorrectionCache:
+    """
+    Caches correction results keyed on model, NFC-normalized input text and generation parameters.
+    Entries live in a bounded in-memory LRU with a TTL; with `path` set they are also written to a
+    sqlite file so warm entries survive restarts; writes to the file run on a background thread so
+    the event loop never waits for a commit. The file is bounded too: every DISK_PRUNE_EVERY writes
+    expired rows are deleted and the rows closest to expiry are dropped beyond `disk_max_entries`,
+    and an expired row found by a lookup is deleted right away. Concurrent misses for the same key share one
+    computation instead of each running generation.
+    """
+
+    def __init__(self, max_entries=1024, ttl_seconds=3600, path=None, disk_max_entries=100000):
+        self.max_entries = max(0, max_entries)
+        self.disk_max_entries = max(1, disk_max_entries)
+        self.ttl = ttl_seconds
+        self.entries = OrderedDict()  # key -> (expires_at, value)
+        self.pending = {}  # key -> task for a computation in progress
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.disk_writes = 0
+        self.disk_evictions = 0
+        self.db = None
+        self.write_db = None
+        self.writer = None
+        if path and self.max_entries:
+            # Lookups use `db` on the event loop thread; writes use `write_db` on the single writer thread.
+            # WAL lets lookups read while a write is being committed.
+            self.db = sqlite3.connect(path, check_same_thread=False)
+            self.db.execute("PRAGMA journal_mode=WAL")
+            self.db.execute("CREATE TABLE IF NOT EXISTS corrections (key TEXT PRIMARY KEY, value TEXT, expires_at REAL)")
+            self.db.execute("CREATE INDEX IF NOT EXISTS corrections_expires_at ON corrections (expires_at)")
+            self.db.commit()
+            self.write_db = sqlite3.connect(path, check_same_thread=False)
+            self.writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="cache-writer")
+            # Start from a file within its bound, whatever a previous run left behind
+            self._submit(self._prune)
+
+    @staticmethod
+    def make_key(model_name, input_text, params):
+        """Build a content-addressed key; NFC-equivalent inputs share an entry."""
+        payload = json.dumps(
+            [model_name, unicodedata.normalize('NFC', input_text), params],
+            ensure_ascii=False,
+            sort_keys=True,
+        )
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    def get(self, key):
+        """Return the cached value for key, or None if it is missing or expired."""
+        now = time.time()
+        entry = self.entries.get(key)
+        if entry is not None:
+            if entry[0] > now:
+                self.entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            del self.entries[key]
+
+        if self.db is not None:
+            row = self.db.execute(
+                "SELECT value, expires_at FROM corrections WHERE key = ?", (key,)
+            ).fetchone()
+            if row is not None:
+                if row[1] > now:
+                    value = json.loads(row[0])
+                    self._remember(key, value, row[1])
+                    self.hits += 1
+                    return value
+                self._submit(self._delete, key, row[1])
+
+        self.misses += 1
+        return None
+
+    def put(self, key, value):
+        if not self.max_entries:
+            return
+        expires_at = time.time() + self.ttl
+        self._remember(key, value, expires_at)
+        if self.writer is not None:
+            self._submit(self._write, key, json.dumps(value, ensure_ascii=False), expires_at)
+
+    def _submit(self, write, *args):
+        if self.writer is not None:
+            self.writer.submit(write, *args).add_done_callback(self._log_write_error)
+
+    # The methods below run on the writer thread only
+
+    def _write(self, key, value, expires_at):
+        self.write_db.execute(
+            "INSERT OR REPLACE INTO corrections (key, value, expires_at) VALUES (?, ?, ?)",
+            (key, value, expires_at),
+        )
+        self.write_db.commit()
+        self.disk_writes += 1
+        if self.disk_writes % DISK_PRUNE_EVERY == 0:
+            self._prune()
+
+    def _delete(self, key, expires_at):
+        # Only the expired row that was read; a fresh write for the same key since then is kept
+        self.write_db.execute("DELETE FROM corrections WHERE key = ? AND expires_at = ?", (key, expires_at))
+        self.write_db.commit()
+
+    def _prune(self):
+        deleted = self.write_db.execute("DELETE FROM corrections WHERE expires_at <= ?", (time.time(),)).rowcount
+        excess = self.write_db.execute("SELECT COUNT(*) FROM corrections").fetchone()[0] - self.disk_max_entries
+        if excess > 0:
+            deleted += self.write_db.execute(
+                "DELETE FROM corrections WHERE key IN (SELECT key FROM corrections ORDER BY expires_at LIMIT ?)",
+                (excess,),
+            ).rowcount
+        self.write_db.commit()
+        self.disk_evictions += deleted
+
+    @staticmethod
+    def _log_write_error(write):
+        if write.exception() is not None:
+            logger.warning("Could not update the persistent cache: %s", write.exception())
+
+    def _remember(self, key, value, expires_at):
+        self.entries[key] = (expires_at, value)
+        self.entries.move_to_end(key)
+        # Evict least recently used entries beyond the memory bound
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+
+    async def get_or_compute(self, key, compute):
+        """
+        Return the cached value for key, or await `compute()` and cache its result.
+        While a computation for key is running, other callers wait for it instead of starting their own.
+        The computation runs as its own task, so a caller that is cancelled (e.g. its client
+        disconnected) stops waiting without cancelling it for the others.
+        """
+        value = self.get(key)
+        if value is not None:
+            return value
+
+        task = self.pending.get(key)
+        if task is not None:
+            self.coalesced += 1
+        else:
+            task = asyncio.get_running_loop().create_task(self._compute(key, compute))
+            # Mark a failure as retrieved in case every caller has stopped waiting
+            task.add_done_callback(lambda task: task.cancelled() or task.exception())
+            self.pending[key] = task
+        return await asyncio.shield(task)
+
+    async def _compute(self, key, compute):
+        try:
+            value = await compute()
+        finally:
+            del self.pending[key]
+        self.put(key, value)
+        return value
+
+    def stats(self):
+        """Return hit/miss counters and the current size of the cache."""
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self.entries),
+            "max_entries": self.max_entries,
+            "ttl_seconds": self.ttl,
+            "persistent": self.db is not None,
+            "disk_max_entries": self.disk_max_entries,
+            "disk_evictions": self.disk_evictions,
+            "hits": self.hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
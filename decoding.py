@@ -0,0 +1,101 @@
+import math
+import threading
+import time
+
+# beam: full beam search (the original behaviour); fast: greedy or low-beam decoding;
+# auto: fast first, escalating to beam only when the fast output changes the input
+DECODING_MODES = ("beam", "fast", "auto")
+
+
+class DecodingPolicy:
+    """
+    Chooses generate settings per request. The output budget is capped relative to the
+    input length, since a correction is about as long as its input, and requests can pick
+    a cheaper tier explicitly or by giving a latency budget the beam tier cannot meet.
+
+    The beam latency estimate only changes when beam generation runs, so once it exceeds every
+    client's budget nothing would refresh it. An estimate older than `estimate_max_age` seconds
+    is therefore stale: one budgeted request per model and period runs beam anyway to measure it
+    again, and its timing replaces the stale value rather than being averaged into it.
+    """
+
+    def __init__(self, beams=5, fast_beams=1, length_ratio=1.5, length_slack=10, max_length=512, estimate_max_age=60):
+        self.beams = {"beam": beams, "fast": fast_beams}
+        self.length_ratio = length_ratio
+        self.length_slack = length_slack
+        self.max_length = max_length
+        self.estimate_max_age = estimate_max_age
+        self.lock = threading.Lock()
+        self.beam_latency = {}  # model -> moving average of beam generate seconds
+        self.observed_at = {}  # model -> monotonic time of the latest beam measurement
+        self.probed_at = {}  # model -> monotonic time a stale estimate last let a request run beam
+
+    def max_new_tokens(self, input_tokens):
+        """Decode budget for an input of `input_tokens` tokens."""
+        return min(self.max_length, math.ceil(input_tokens * self.length_ratio) + self.length_slack)
+
+    def generation_params(self, tier, input_tokens):
+        """generate() keyword arguments for the 'beam' or 'fast' tier."""
+        num_beams = self.beams[tier]
+        return {
+            "max_new_tokens": self.max_new_tokens(input_tokens),
+            "num_beams": num_beams,
+            "early_stopping": num_beams > 1,
+        }
+
+    def cache_params(self, mode):
+        """Settings that change the output for `mode`; used as part of the correction cache key."""
+        return {
+            "decoding": mode,
+            "beams": self.beams,
+            "length_ratio": self.length_ratio,
+            "length_slack": self.length_slack,
+            "max_length": self.max_length,
+        }
+
+    def observe(self, model_name, tier, seconds):
+        """Track how long beam generation takes for a model, to compare with latency budgets."""
+        if tier != "beam":
+            return
+        now = time.monotonic()
+        with self.lock:
+            previous = self.beam_latency.get(model_name)
+            if previous is None or self._stale(model_name, now):
+                self.beam_latency[model_name] = seconds
+            else:
+                self.beam_latency[model_name] = 0.8 * previous + 0.2 * seconds
+            self.observed_at[model_name] = now
+
+    def _stale(self, model_name, now):
+        return now - self.observed_at.get(model_name, now) > self.estimate_max_age
+
+    def estimate(self, model_name):
+        """The model's beam latency estimate as (seconds, age in seconds), or None before any beam run."""
+        with self.lock:
+            if model_name not in self.beam_latency:
+                return None
+            return self.beam_latency[model_name], time.monotonic() - self.observed_at[model_name]
+
+    def adopt(self, model_name, estimate):
+        """Take over an estimate() made elsewhere, e.g. by a separate inference process."""
+        if estimate is None:
+            return
+        seconds, age = estimate
+        with self.lock:
+            self.beam_latency[model_name] = seconds
+            self.observed_at[model_name] = time.monotonic() - age
+
+    def choose(self, model_name, mode, latency_budget_ms=None):
+        """Downgrade 'beam' to 'fast' when recent beam generation for the model exceeds the latency budget."""
+        if mode == "beam" and latency_budget_ms is not None:
+            now = time.monotonic()
+            with self.lock:
+                expected = self.beam_latency.get(model_name)
+                if expected is None or expected * 1000 <= latency_budget_ms:
+                    return mode
+                if self._stale(model_name, now) and now - self.probed_at.get(model_name, -math.inf) > self.estimate_max_age:
+                    # Let this request measure beam again instead of trusting an old estimate forever
+                    self.probed_at[model_name] = now
+                    return mode
+            return "fast"
+        return mode
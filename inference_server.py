@@ -0,0 +1,85 @@
+"""
+Run the models in one process for several HTTP workers.
+The enabled models are loaded here once (WARMUP_MODELS, idle unloading and the backend
+settings apply as usual) and served to the uvicorn workers over a Unix socket, so adding
+workers adds HTTP and error-detection capacity without another copy of the weights. Requests
+from all workers share this process's micro-batchers, so they also batch together.
+
+Usage: python inference_server.py --socket /tmp/urdu_correct_inference.sock
+Start the workers with INFERENCE_SOCKET set to the same path (serve.py does both).
+"""
+import argparse
+import asyncio
+import os
+import signal
+
+# This process runs the models itself, whatever the workers are configured with
+os.environ.pop("INFERENCE_SOCKET", None)
+
+import main
+from remote import serve
+
+
+async def generate(message):
+    name = message["model"]
+    results = await main.batchers[name].submit_many([tuple(item) for item in message["items"]])
+    return {
+        "results": results,
+        "batching": main.batchers[name].stats(),
+        "model": main.model_registry.stats()[name],
+        "beam_latency": main.decoding_policy.estimate(name),
+    }
+
+
+async def stream(message):
+    name = message["model"]
+    async for piece in main.stream_generation(name, message["input_text"]):
+        if "done" in piece:
+            piece = dict(piece, model=main.model_registry.stats()[name])
+        yield piece
+
+
+async def warmup(message):
+    await asyncio.get_running_loop().run_in_executor(main.inference_executor, main.model_registry.warmup, message["models"])
+    return {"models": main.model_registry.stats()}
+
+
+async def stats(message):
+    return {
+        "models": main.model_registry.stats(),
+        "batching": {name: batcher.stats() for name, batcher in main.batchers.items()},
+        "streams": {name: slots.stats() for name, slots in main.stream_slots.items()},
+    }
+
+
+async def run(socket_path):
+    # Warm up models and start idle unloading exactly as a standalone server would
+    await main.app.router.startup()
+    server = await serve(socket_path, {"generate": generate, "stream": stream, "warmup": warmup, "stats": stats})
+    main.logger.info("Inference process serving %s on %s", ", ".join(main.enabled_models), socket_path)
+    # serve.py stops this process with SIGTERM; shut down cleanly so the socket is removed
+    serving = asyncio.current_task()
+    asyncio.get_running_loop().add_signal_handler(signal.SIGTERM, serving.cancel)
+    try:
+        async with server:
+            await server.serve_forever()
+    except asyncio.CancelledError:
+        pass
+    finally:
+        await main.app.router.shutdown()
+        if os.path.exists(socket_path):
+            os.unlink(socket_path)
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--socket", required=True)
+    args = parser.parse_args()
+    try:
+        asyncio.run(run(args.socket))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main_cli()
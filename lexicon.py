@@ -0,0 +1,293 @@
+"""
+Compile the error dictionaries into the binary lexicon detect_errors and the pre-screen read.
+The sources are a directory with dictionaries.json, listing each dictionary's name, TSV file,
+error type, reason and whether it is `exact_match` (its entries only match a replaced word
+exactly, with no case or number suffix), and one TSV file per dictionary with a
+`correct<TAB>incorrect` pair per line (blank lines and lines starting with # are ignored).
+
+The compiled file holds the incorrect words sorted by their UTF-8 bytes next to flat arrays of
+their entries, so it is memory-mapped as is: opening it takes the same time however many
+entries it has, and a lookup is a binary search over the mapped pages. The service compiles it
+on startup when it is missing or out of date with the sources, so running this is only needed to
+check edited sources or to build the file ahead of time (the Dockerfile does).
+
+Usage: python lexicon.py [--source lexicon] [--output lexicon/lexicon.bin]
+"""
+import argparse
+import functools
+import hashlib
+import json
+import mmap
+import os
+import struct
+import tempfile
+import unicodedata
+from array import array
+
+MANIFEST = "dictionaries.json"
+
+# Magic, format version, then the key, string and entry counts and the string blob and metadata sizes.
+# Arrays are written in native byte order; a file from a machine with the other order fails the version check.
+HEADER = struct.Struct("=8s6I")
+MAGIC = b"URLEXBIN"
+FORMAT_VERSION = 1
+
+# Words looked up per lexicon (stems of each input word); common words repeat across requests
+LOOKUP_CACHE_SIZE = 65536
+
+
+class LexiconError(ValueError):
+    """Raised for invalid lexicon sources or an unreadable compiled lexicon."""
+
+
+def read_sources(directory):
+    """
+    Read the dictionaries listed in `directory`/dictionaries.json in order.
+    Returns the manifest entries, each with an "entries" list of NFC-normalized (correct, incorrect) pairs.
+    """
+    manifest_path = os.path.join(directory, MANIFEST)
+    try:
+        with open(manifest_path, encoding="utf-8") as f:
+            dictionaries = json.load(f)
+    except (OSError, json.JSONDecodeError) as exc:
+        raise LexiconError(f"{manifest_path}: {exc}") from exc
+    if not isinstance(dictionaries, list) or not all(isinstance(dictionary, dict) for dictionary in dictionaries):
+        raise LexiconError(f"{manifest_path}: expected a list of dictionaries")
+
+    names = set()
+    result = []
+    for dictionary in dictionaries:
+        missing = [field for field in ("name", "file", "error_type", "reason") if not dictionary.get(field)]
+        if missing:
+            raise LexiconError(f"{manifest_path}: dictionary {dictionary.get('name', '?')} has no {', '.join(missing)}")
+        if dictionary["name"] in names:
+            raise LexiconError(f"{manifest_path}: dictionary {dictionary['name']} is listed twice")
+        names.add(dictionary["name"])
+
+        path = os.path.join(directory, dictionary["file"])
+        entries = []
+        try:
+            with open(path, encoding="utf-8") as f:
+                for line_number, line in enumerate(f, 1):
+                    line = line.rstrip("\r\n")
+                    if not line.strip() or line.startswith("#"):
+                        continue
+                    fields = [unicodedata.normalize("NFC", field.strip()) for field in line.split("\t")]
+                    if len(fields) != 2 or not all(fields):
+                        raise LexiconError(f"{path}:{line_number}: expected 'correct<TAB>incorrect', got {line!r}")
+                    entries.append((fields[0], fields[1]))
+        except OSError as exc:
+            raise LexiconError(f"{path}: {exc}") from exc
+        result.append(dict(dictionary, exact_match=bool(dictionary.get("exact_match")), entries=entries))
+    return result
+
+
+def source_paths(directory):
+    """The manifest and the dictionary files it lists (just the manifest if it cannot be read)."""
+    manifest_path = os.path.join(directory, MANIFEST)
+    try:
+        with open(manifest_path, encoding="utf-8") as f:
+            return [manifest_path] + [os.path.join(directory, dictionary["file"]) for dictionary in json.load(f)]
+    except (OSError, ValueError, KeyError, TypeError):
+        return [manifest_path]
+
+
+def source_fingerprint(directory):
+    """
+    [name, size, mtime] of the manifest and each dictionary file it lists. Stored in the compiled
+    file and compared on reload, which unlike comparing modification times against the compiled
+    file also catches an edit made within the same timestamp tick as the last compile.
+    """
+    fingerprint = []
+    for source in source_paths(directory):
+        try:
+            stat = os.stat(source)
+        except FileNotFoundError:
+            continue
+        fingerprint.append([os.path.relpath(source, directory), stat.st_size, stat.st_mtime_ns])
+    return fingerprint
+
+
+def compile_lexicon(directory, path):
+    """Compile the sources in `directory` to `path`, replacing any previous file atomically. Returns its checksum."""
+    # Taken before reading, so an edit made while compiling is picked up by the next reload
+    sources = source_fingerprint(directory)
+    dictionaries = read_sources(directory)
+
+    # incorrect word -> [(dictionary, entry, correct word)], in dictionary order
+    index = {}
+    for dict_order, dictionary in enumerate(dictionaries):
+        for entry_order, (correct_word, incorrect_word) in enumerate(dictionary["entries"]):
+            index.setdefault(incorrect_word, []).append((dict_order, entry_order, correct_word))
+
+    # The sorted incorrect words come first in the string table, so a word's position is its key id
+    keys = sorted(index, key=lambda word: word.encode("utf-8"))
+    string_ids = {word: key_id for key_id, word in enumerate(keys)}
+    strings = list(keys)
+    entry_start = array("I", [0])
+    entries = array("I")
+    for word in keys:
+        for dict_order, entry_order, correct_word in index[word]:
+            if correct_word not in string_ids:
+                string_ids[correct_word] = len(strings)
+                strings.append(correct_word)
+            entries.extend((dict_order, entry_order, string_ids[correct_word]))
+        entry_start.append(len(entries) // 3)
+
+    blob = bytearray()
+    string_offsets = array("I", [0])
+    for string in strings:
+        blob += string.encode("utf-8")
+        string_offsets.append(len(blob))
+    blob += b"\0" * (-len(blob) % 4)
+
+    body = string_offsets.tobytes() + entry_start.tobytes() + entries.tobytes() + bytes(blob)
+    described = [
+        {field: dictionary[field] for field in ("name", "error_type", "reason", "exact_match")}
+        for dictionary in dictionaries
+    ]
+    # Changes whenever lookups could give a different answer, so results can be cached per checksum
+    checksum = hashlib.sha256(body + json.dumps(described, ensure_ascii=False).encode("utf-8")).hexdigest()[:16]
+    meta = json.dumps({"checksum": checksum, "dictionaries": described, "sources": sources}, ensure_ascii=False).encode("utf-8")
+    header = HEADER.pack(MAGIC, FORMAT_VERSION, len(keys), len(strings), len(entries) // 3, len(blob), len(meta))
+
+    # Write next to the target and rename over it, so readers see either the old file or the new one
+    fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(path)), prefix=".lexicon-")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(header + body + meta)
+        os.chmod(temp_path, 0o644)
+        os.replace(temp_path, path)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.unlink(temp_path)
+        raise
+    return checksum
+
+
+def file_signature(stat):
+    """Identifies one version of the compiled file; compile_lexicon's rename gives it a new inode."""
+    return stat.st_ino, stat.st_mtime_ns, stat.st_size
+
+
+class Lexicon:
+    """
+    A compiled lexicon, memory-mapped read-only. `entries(word)` returns the entries whose
+    incorrect word is exactly `word` as ((dictionary, entry), dict_name, correct_word, error_type,
+    reason) tuples in dictionary order. Instances never change; a new version is a new Lexicon,
+    and the mapping is released once the last reference to the old one goes away.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        try:
+            with open(path, "rb") as f:
+                self.signature = file_signature(os.fstat(f.fileno()))
+                self.data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            magic, version, self.key_count, string_count, entry_count, blob_size, meta_size = HEADER.unpack_from(self.data)
+        except (OSError, ValueError, struct.error) as exc:
+            raise LexiconError(f"{path}: {exc}") from exc
+        if magic != MAGIC or version != FORMAT_VERSION:
+            raise LexiconError(f"{path}: not a compiled lexicon of format version {FORMAT_VERSION}")
+
+        view = memoryview(self.data)
+        offset = HEADER.size
+        self.string_offsets = view[offset:offset + (string_count + 1) * 4].cast("I")
+        offset += (string_count + 1) * 4
+        self.entry_start = view[offset:offset + (self.key_count + 1) * 4].cast("I")
+        offset += (self.key_count + 1) * 4
+        self.entry_data = view[offset:offset + entry_count * 12].cast("I")
+        offset += entry_count * 12
+        self.blob_offset = offset
+        offset += blob_size
+        meta = json.loads(bytes(view[offset:offset + meta_size]))
+
+        self.entry_count = entry_count
+        self.checksum = meta["checksum"]
+        self.sources = meta["sources"]
+        self.dictionaries = [(d["name"], d["error_type"], d["reason"]) for d in meta["dictionaries"]]
+        # Dictionaries whose entries only match a replaced word exactly (no suffix stripping)
+        self.exact_match = frozenset(d["name"] for d in meta["dictionaries"] if d["exact_match"])
+        self.entries = functools.lru_cache(maxsize=LOOKUP_CACHE_SIZE)(self._entries)
+
+    def _string(self, string_id):
+        start = self.blob_offset + self.string_offsets[string_id]
+        return self.data[start:self.blob_offset + self.string_offsets[string_id + 1]]
+
+    def _entries(self, word):
+        key = word.encode("utf-8")
+        low, high = 0, self.key_count
+        while low < high:
+            middle = (low + high) // 2
+            if self._string(middle) < key:
+                low = middle + 1
+            else:
+                high = middle
+        if low == self.key_count or self._string(low) != key:
+            return ()
+
+        entries = []
+        for entry in range(self.entry_start[low], self.entry_start[low + 1]):
+            dict_order, entry_order, correct_id = self.entry_data[entry * 3:entry * 3 + 3]
+            dict_name, error_type, reason = self.dictionaries[dict_order]
+            entries.append(((dict_order, entry_order), dict_name, self._string(correct_id).decode("utf-8"), error_type, reason))
+        return tuple(entries)
+
+    def is_current(self):
+        """Whether the file at `path` is still the one this lexicon was opened from."""
+        try:
+            return file_signature(os.stat(self.path)) == self.signature
+        except FileNotFoundError:
+            return False
+
+    def sources_changed(self, directory):
+        """Whether the dictionaries in `directory` differ from the ones this lexicon was compiled from."""
+        return os.path.isdir(directory) and source_fingerprint(directory) != self.sources
+
+    def stats(self):
+        return {
+            "path": self.path,
+            "checksum": self.checksum,
+            "dictionaries": len(self.dictionaries),
+            "words": self.key_count,
+            "entries": self.entry_count,
+            "size_bytes": len(self.data),
+        }
+
+
+def load_lexicon(directory, path, rebuild=False):
+    """
+    Open the compiled lexicon at `path`, compiling it from `directory` first when `rebuild` is set
+    or it is missing, out of date with the sources or written by an incompatible version.
+    """
+    if not rebuild:
+        try:
+            lexicon = Lexicon(path)
+        except LexiconError:
+            if not os.path.isdir(directory):
+                raise
+        else:
+            if not lexicon.sources_changed(directory):
+                return lexicon
+    compile_lexicon(directory, path)
+    return Lexicon(path)
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--source", default=os.path.join(os.path.dirname(os.path.abspath(__file__)), "lexicon"))
+    parser.add_argument("--output", help="compiled file (default: lexicon.bin in the source directory)")
+    args = parser.parse_args()
+
+    output = args.output or os.path.join(args.source, "lexicon.bin")
+    try:
+        compile_lexicon(args.source, output)
+    except LexiconError as exc:
+        parser.exit(1, f"error: {exc}\n")
+    stats = Lexicon(output).stats()
+    print(f"{output}: {stats['dictionaries']} dictionaries, {stats['entries']} entries for "
+          f"{stats['words']} incorrect words, {stats['size_bytes']} bytes (checksum {stats['checksum']})")
+
+
+if __name__ == "__main__":
+    main_cli()
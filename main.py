@@ -1,13 +1,47 @@
 
+import asyncio
+import os
 import re
 import torch
 import unicodedata
-import difflib  # Added import
-from difflib import SequenceMatcher  # Explicitly import SequenceMatcher
-from fastapi import FastAPI
+import functools
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+from fastapi import FastAPI, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse, StreamingResponse
 from pydantic import BaseModel
-from transformers import MT5Tokenizer, MT5ForConditionalGeneration, MBart50TokenizerFast, MBartForConditionalGeneration
+from typing import Literal
+from alignment import get_opcodes
+from backends import apply_backend
+from batching import MicroBatcher, QueueFullError, StreamSlots
+from cache import CorrectionCache
+from decoding import DecodingPolicy
+from lexicon import LexiconError, load_lexicon
+from prescreen import Prescreen
+from metrics import LATENCY_BUCKETS, TOKEN_BUCKETS, Metrics
+from registry import LoadedModel, ModelRegistry
+from remote import InferenceClient, RemoteBatcher
+from segmentation import sentence_spans, stitch
+from streaming import AsyncTextStreamer, sse_event
+from tokenization import prompt_tokenizer_for
+from transformers import MT5Tokenizer, MT5TokenizerFast, MT5ForConditionalGeneration, MBart50TokenizerFast, MBartForConditionalGeneration
+
+# LOG_LEVEL=DEBUG logs every alignment and comparison made by detect_errors
+logging.basicConfig(level=os.environ.get("LOG_LEVEL", "INFO").upper(), format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+logger = logging.getLogger("urdu_correct")
+
+metrics = Metrics()
+metrics.describe("urdu_correct_requests_total", "counter", "HTTP requests by endpoint and status code.")
+metrics.describe("urdu_correct_request_seconds", "histogram", "HTTP request latency by endpoint.", LATENCY_BUCKETS)
+metrics.describe("urdu_correct_stage_seconds", "histogram", "Time spent in each correction stage (tokenize, generate, decode, detect_errors) by model.", LATENCY_BUCKETS)
+metrics.describe("urdu_correct_input_tokens", "histogram", "Input tokens per text passed to generate.", TOKEN_BUCKETS)
+metrics.describe("urdu_correct_output_tokens", "histogram", "Output tokens per generated text.", TOKEN_BUCKETS)
+metrics.describe("urdu_correct_generate_calls_total", "counter", "generate calls by model and beam count.")
+metrics.describe("urdu_correct_decoding_total", "counter", "Correction requests by model and chosen decoding mode.")
+metrics.describe("urdu_correct_prescreen_total", "counter", "Texts checked by the pre-screen, by whether generation was skipped.")
+metrics.describe("urdu_correct_escalations_total", "counter", "Texts re-generated with beam search after the fast pass changed them.")
 
 app = FastAPI()
 
@@ -20,238 +54,136 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Load models and tokenizers
+# Models and tokenizers are loaded on first use (or at startup for WARMUP_MODELS) through the registry.
 # MT5 for paragraphs (renamed endpoint)
 mt5_paragraph_model_path = "RanawahajAhmed/finetuned_mt5_large_for_urdu_correction"
-mt5_paragraph_tokenizer = MT5Tokenizer.from_pretrained(mt5_paragraph_model_path, use_fast=False)
-mt5_paragraph_model = MT5ForConditionalGeneration.from_pretrained(mt5_paragraph_model_path)
 
 # MT5 for sentences
 mt5_sentence_model_path = "RanawahajAhmed/mt5_finetuned_for_urdu_sentence_correction"
-mt5_sentence_model = MT5ForConditionalGeneration.from_pretrained(mt5_sentence_model_path)
-mt5_sentence_tokenizer = mt5_paragraph_tokenizer  # Reuse the existing MT5 tokenizer
 
 # mBART for paragraphs
 bart_paragraph_model_path = "RanawahajAhmed/mbart_finetuned_for_urdu_paragraphs_correction"
-print(f"Loading tokenizer from {bart_paragraph_model_path}...")
-bart_paragraph_tokenizer = MBart50TokenizerFast.from_pretrained(bart_paragraph_model_path)
-urdu_lang_id = bart_paragraph_tokenizer.lang_code_to_id.get("ur_PK", 250054)  # Default to 250054 if ur_PK not found
-print("Tokenizer loaded successfully.")
-print(f"Loading model from {bart_paragraph_model_path}...")
-bart_paragraph_model = MBartForConditionalGeneration.from_pretrained(bart_paragraph_model_path)
-print("Model loaded successfully.")
-
-# Error dictionaries (same as provided)
-noun_errors = {
-    "پاکستان": "پاکیستان", "لوگ": "لوک", "مسائل": "مسایل", "مہنگائی": "مہنگای", "حکومت": "حوکمت",
-    "تعلیم": "تعلم", "صحت": "سحت", "گاؤں": "گاؤن", "موسم": "موسوم", "ٹیکنالوجی": "ٹکنالوجی",
-    "پانی": "پانے", "کرپشن": "کرفشن", "روزگار": "روزگاز", "سیاحت": "سایاحت", "نوجوان": "نووجوان",
-    "زراعت": "زرات", "صنعت": "سنعت", "سیلاب": "سیلاپ", "ٹرانسپورٹ": "ٹرانسپوٹ", "خواتین": "خواتیں",
-    "کھیل": "کحیل", "آلودگی": "الودگی", "امید": "امد", "دوستی": "دوسٹی", "زندگی": "زندکی"
-}
-
-verb_errors = {
-    "کرتے": "کرو", "بتا": "بولو", "بڑھ": "چڑھ", "ہو": "جا", "آتی": "جاتی", "رکھنا": "اٹھانا",
-    "سوچنا": "سونگھنا", "ملتی": "ٹلتی", "آزماتے": "چکھتے", "نکلتی": "پھسلتی", "دیتا": "بیچتا",
-    "بدل": "پھٹ", "رکھتی": "پکڑتی", "آتا": "بھاگتا", "چھوڑ": "پھوڑ", "لینا": "دھونا", "دیکھنا": "چومنا",
-    "سمجھنا": "چلنا", "پڑھنا": "گھومنا", "چلنا": "ہنسنا", "لگایا": "جلایا", "کمایا": "سمجھایا",
-    "کیا": "پیا", "دیا": "کیا", "کیں": "سیں", "آئیں": "جائیں", "دیں": "لیں", "کریں": "سریں"
-}
-
-pronoun_errors = {
-    "وہ": "یہ", "ہم": "تم", "اس": "ان", "ان": "اس", "ہمارے": "تمہارے", "یہ": "وہ", "کسی": "کوئی",
-    "جو": "جس", "ہر": "کوئی", "اپنی": "ان کی", "تم": "ہم", "میں": "ہم", "ہمیں": "تمہیں", "انہوں": "اس نے",
-    "کس": "کیا", "کچھ": "سب", "کوئی": "ہر", "خود": "دوسرے", "ان کا": "ہمارا", "اپنوں": "دوسروں",
-    "ہم سب": "تم سب", "ان سب": "اس سب", "کس نے": "کیا نے", "جس نے": "جو نے", "جو کچھ": "کچھ بھی",
-    "ہر ایک": "کوئی ایک", "ان کے": "ہمارے", "ہم نے": "تم نے", "تم نے": "ہم نے"
-}
-
-prepositions_conjunctions_errors = {
-    "میں": "سے", "سے": "میں", "کے": "پر", "پر": "کے", "اور": "یا", "تا کہ": "کیونکہ", "کی": "کا",
-    "کہ": "جو", "لیے": "بغیر", "بھی": "نہ", "جس": "کہ", "اگر": "ورنہ", "تو": "مگر", "جب": "کہاں",
-    "تک": "سے", "چونکہ": "تاکہ", "کیونکہ": "اگر", "جو": "کہ", "جن": "جس", "ورنہ": "اگر", "یا": "اور",
-    "مگر": "تو", "بل کہ": "بلکہ", "جب کہ": "کیونکہ"
-}
-
-object_errors = {
-    "مسائل": "مسایئل", "مہنگائی": "مہنگای", "تعلیم": "تلیم", "صحت": "سحت", "پانی": "پانے", "کرپشن": "کرپسشن",
-    "روزگار": "روزگارد", "سیاحت": "سیاحٹ", "نوجوان": "نواجوان", "زراعت": "زراعٹ", "صنعت": "سنعت",
-    "سیلاب": "سیلب", "ٹرانسپورٹ": "ٹرانسپوٹ", "خواتین": "خواتیں", "کھیل": "خیل", "آلودگی": "آلدگی",
-    "امید": "امد", "دوستی": "دوستے", "زندگی": "زندگے", "سہولتیں": "سہولتین", "اصلاحات": "اصلحات",
-    "سرمایہ": "سرمائہ", "منصوبے": "منصوبہ", "حقوق": "حقووق", "وسائل": "وسائیل"
-}
-
-past_tense_verb_errors = {
-    "بڑھ گئی": "بڑھتا", "ہو گیا": "ہوتا", "متاثر ہوئی": "متاثر ہوتا", "آ گئے": "آتا", "کہا": "کہتا",
-    "بتایا": "بتاتا", "بنائے گئے": "بناتا", "دیا": "دیتا", "پڑھا": "پڑھتا", "چلا": "چلتا", "لگا": "لگتا",
-    "ہوئے": "ہوتا", "رکھا": "رکھتا", "کیا": "کرتا", "آئی": "آتا", "دیکھا": "دیکھتا", "سمجھا": "سمجھتا",
-    "چھوڑا": "چھوڑتا", "ہوئیں": "ہوتا", "پہنچا": "پہنچتا", "مل گیا": "ملتا", "بدل گیا": "بدلتا",
-    "کمایا": "کماتا", "لگایا": "لگاتا", "بنا": "بناتا", "بڑھائی": "بڑھاتا", "پایا": "پاتا", "کیے": "کرتا",
-    "سوچا": "سوچتا", "آزمایا": "آزماتا", "نکلا": "نکلتا", "بدلا": "بدلتا", "آیا": "آتا", "لیا": "لیتا",
-    "رکھے": "رکھتا", "کیں": "کرتا", "آئیں": "آتا", "دیں": "دیتا", "بڑھائیں": "بڑھاتا", "پائیں": "پاتا",
-    "کریں": "کرتا", "ہوئی": "ہوتا", "گئی": "جاتا"
-}
-
-present_tense_verb_errors = {
-    "کرتے ہیں": "کریں گے", "بتا رہا ہے": "بتائے گا", "بڑھ رہی ہے": "بڑھے گی", "ہوتا ہے": "ہو گا",
-    "لگتا ہے": "لگے گا", "چاہیے": "چاہیے گا", "دینی ہے": "دے گا", "متاثر ہو رہا ہے": "متاثر ہو گا",
-    "پڑتا ہے": "پڑے گا", "حاصل کر رہے ہیں": "حاصل کریں گے", "دیتی ہے": "دے گی", "بناتے ہیں": "بنائیں گے",
-    "آتی ہے": "آئے گی", "رکھتا ہے": "رکھے گا", "سوچتے ہیں": "سوچیں گے", "ملتی ہے": "ملے گی",
-    "آزماتے ہیں": "آزمائیں گے", "نکلتی ہے": "نکلے گی", "دیتا ہے": "دے گا", "بدلتے ہیں": "بدلیں گے",
-    "رکھتی ہے": "رکھے گی", "آتا ہے": "آئے گا", "چھوڑتے ہیں": "چھوڑیں گے", "لیتے ہیں": "لیں گے",
-    "دیکھتے ہیں": "دیکھیں گے", "سمجھتے ہیں": "سمجھیں گے", "پڑھتے ہیں": "پڑھیں گے", "چلتے ہیں": "چلیں گے",
-    "لگاتے ہیں": "لگائیں گے", "کماتے ہیں": "کمائیں گے", "رکھتے ہیں": "رکھیں گے", "کرتی ہے": "کرے گی",
-    "بتاتی ہے": "بتائے گی", "بڑھتا ہے": "بڑھے گا", "لگتی ہے": "لگے گی", "دیتے ہیں": "دیں گے",
-    "بناتی ہے": "بنائے گی", "آتے ہیں": "آئیں گے", "رکھتی ہیں": "رکھیں گی", "سوچتی ہے": "سوچے گی",
-    "ملتا ہے": "ملے گا", "آزماتی ہے": "آزمائے گی", "نکلتے ہیں": "نکلیں گے", "بدلتی ہے": "بدلے گی",
-    "چھوڑتی ہے": "چھوڑے گی", "لیتی ہے": "لے گی", "دیکھتی ہے": "دیکھے گی", "سمجھتی ہے": "سمجھے گی",
-    "پڑھتی ہے": "پڑھے گی", "چلتی ہے": "چلے گی", "لگاتی ہے": "لگائے گی", "کماتی ہے": "کمائے گی",
-    "کر رہے ہیں": "کریں گے", "بتا رہے ہیں": "بتائیں گے", "بڑھ رہے ہیں": "بڑھیں گے", "لگ رہے ہیں": "لگیں گے"
-}
-
-future_tense_verb_errors = {
-    "ہو گا": "ہوا", "کر سکتے ہیں": "کر سکتے تھے", "آئے گا": "آیا", "دیں گے": "دیا", "بنا سکتے ہیں": "بنا سکتے تھے",
-    "پائیں گے": "پایا", "ملے گا": "ملا", "ہوں گی": "تھیں", "کریں گے": "کیا", "بڑھے گا": "بڑھا",
-    "رکھ سکتے ہیں": "رکھ سکتے تھے", "سوچ سکتے ہیں": "سوچ سکتے تھے", "بدل سکتے ہیں": "بدل سکتے تھے",
-    "چھوڑیں گے": "چھوڑا", "لیں گے": "لیا", "آئیں گے": "آئے", "پڑھ سکتے ہیں": "پڑھ سکتے تھے",
-    "دیکھیں گے": "دیکھا", "سمجھیں گے": "سمجھا", "ہو سکتے ہیں": "ہو سکتے تھے", "لگے گا": "لگا",
-    "کمایا جائے گا": "کمایا گیا", "لگایا جائے گا": "لگایا گیا", "بنایا جائے گا": "بنایا گیا",
-    "بڑھایا جائے گا": "بڑھایا گیا", "پایا جائے گا": "پایا گیا", "کیا جائے گا": "کیا گیا",
-    "رکھا جائے گا": "رکھا گیا", "دیا جائے گا": "دیا گیا"
-}
-
-singular_errors = {
-    "پاکستان": "پاکستن", "دوست": "دووست", "مسئلہ": "مسئیلہ", "مہنگائی": "مہنگای", "حکومت": "حکومٹ",
-    "تعلیم": "تلیم", "صحت": "سحت", "گاؤں": "گاؤن", "موسم": "موسسم", "ٹیکنالوجی": "ٹکنالوجی",
-    "پانی": "پانے", "کرپشن": "کرپسشن", "روزگار": "روزگارد", "سیاحت": "سیاحٹ", "نوجوان": "نواجوان",
-    "زراعت": "زراعٹ", "صنعت": "سنعت", "سیلاب": "سیلب", "ٹرانسپورٹ": "ٹرانسپرٹ", "خاتون": "خاتوون",
-    "کھیل": "خیل", "آلودگی": "آلدگی", "امید": "امد", "دوستی": "دوستے", "زندگی": "زندگے"
-}
-
-plural_errors = {
-    "لوگ": "لوک", "مسائل": "مسایئل", "اخراجات": "اخرجت", "سہولتیں": "سہولتین", "ادارے": "ادارہ",
-    "طلبہ": "طلباء", "والدین": "والداین", "نوجوانوں": "نواجوانوں", "موسموں": "موسسموں", "مہارتیں": "مہارتین",
-    "وسائل": "وسائیل", "مواقع": "مواقق", "اصلاحات": "اصلحات", "منصوبوں": "منصوبہ", "حقوق": "حقووق",
-    "کھیلوں": "خیلوں", "شہروں": "شہرن", "بچوں": "بچن", "پروگرامز": "پروگرمز", "کاروباروں": "کارباروں",
-    "سیاحوں": "سیاحن", "مریضوں": "مریضن", "پالیسیوں": "پالسیوں", "اتفاقیات": "اتفقیات", "یادیں": "یادین"
-}
-
-masculine_errors = {
-    "دوست": "دووست", "شخص": "شخس", "نوجوان": "نواجوان", "طالب": "طلیب", "والد": "والدد", "کسان": "کسسن",
-    "سیاح": "سیح", "مریض": "مرض", "ڈاکٹر": "ڈکٹر", "سیاستدان": "سیاسدان", "گاؤں": "گاؤن", "شہر": "شہہر",
-    "موسم": "موسسم", "روزگار": "روزگارد", "کاروبار": "کاربار", "منصوبہ": "منصوبہہ", "کھیل": "خیل",
-    "پانی": "پانے", "ماحول": "محول", "وسائل": "وسائیل", "امن": "امم", "صبر": "سبر", "خواب": "خوب",
-    "رشتہ": "رشہ", "چیلنج": "چلنج"
-}
 
-feminine_errors = {
-    "مہنگائی": "مہنگای", "حکومت": "حکومٹ", "تعلیم": "تلیم", "صحت": "سحت", "ٹیکنالوجی": "ٹکنالوجی",
-    "کرپشن": "کرپسشن", "سیاحت": "سیاحٹ", "زراعت": "زراعٹ", "صنعت": "سنعت", "آلودگی": "آلدگی",
-    "امید": "امد", "دوستی": "دوستے", "زندگی": "زندگے", "سہولت": "سہوللت", "اصلاح": "اصلح",
-    "سرمایہ": "سرمائہ", "پالیسی": "پالسی", "خاتون": "خاتوون", "مہارت": "محارت", "کوشش": "کوشس",
-    "مسکراہٹ": "مسکاہٹ", "خاموشی": "خموشی", "خوشی": "خشی", "یاد": "یادد", "ترقی": "ترقے"
+model_paths = {
+    "mt5_paragraph": mt5_paragraph_model_path,
+    "mt5_sentence": mt5_sentence_model_path,
+    "bart_paragraph": bart_paragraph_model_path,
 }
-
-direct_object_errors = {
-    "مسائل": "مسایئل", "مہنگائی": "مہنگای", "تعلیم": "تلیم", "صحت": "سحت", "پانی": "پانے", "کرپشن": "کرپسشن",
-    "روزگار": "روزگارد", "سیاحت": "سیاحٹ", "نوجوان": "نواجوان", "زراعت": "زراعٹ", "صنعت": "سنعت",
-    "سیلاب": "سیلب", "ٹرانسپورٹ": "ٹرانسپرٹ", "خواتین": "خواتیں", "کھیل": "خیل", "آلودگی": "آلدگی",
-    "امید": "امد", "دوستی": "دوستے", "زندگی": "زندگے", "سہولتیں": "سہولتین", "اصلاحات": "اصلحات",
-    "سرمایہ": "سرمائہ", "منصوبے": "منصوبہ", "حقوق": "حقووق", "وسائل": "وسائیل"
-}
-
-indirect_object_errors = {
-    "پاکستان میں": "پاکستن میں", "گاؤں میں": "گاؤن میں", "شہر میں": "شہہر میں", "مارکیٹ میں": "مارکیٹٹ میں",
-    "اسکولوں میں": "اسکولن میں", "اسپتالوں میں": "اسپتلن میں", "شعبوں میں": "شعبن میں", "میدانوں میں": "میدانن میں",
-    "اداروں میں": "ادارن میں", "منصوبوں میں": "منصوبن میں", "موسموں میں": "موسسموں میں", "حالات میں": "حالت میں",
-    "زندگی میں": "زندگے میں", "معاشرے میں": "معاشرہ میں", "دور میں": "دورر میں", "وقت میں": "وققت میں",
-    "ماحول میں": "محول میں", "سہولتوں میں": "سہولتین میں", "مسائل میں": "مسایئل میں", "حقوق میں": "حقووق میں",
-    "ترقی میں": "ترقے میں", "امن میں": "امم میں", "خوابوں میں": "خوابن میں", "امید میں": "امد میں",
-    "دوستی میں": "دوستے میں"
-}
-
-adverb_errors = {
-    "زیادہ": "زیادہہ", "فوری": "فورری", "سست": "سسٹ", "برابر": "برابار", "مناسب طور پر": "مناسب طورر پر",
-    "شدید": "شدیدد", "آہستہ": "آہستہہ", "ہمیشہ": "ہمشہ", "کبھی": "کبھے", "ابھی": "ابھے", "پہلے": "پہلہ",
-    "بعد": "بدد", "صرف": "سررف", "بہت": "بہہت", "کم": "ککم", "دوبارہ": "دوبارہہ", "اکثر": "اکسر",
-    "ہر سال": "ہرر سال", "جلدی": "جلدے", "صحیح": "سحیح", "واضح": "واضضح", "خاموشی سے": "خموشی سے",
-    "درست": "درسٹ", "سادہ": "سادہہ"
-}
-
-possessive_noun_errors = {
-    "پاکستان کی": "پاکستن کی", "لوگوں کی": "لوکوں کی", "حکومت کی": "حکومٹ کی", "تعلیم کی": "تلیم کی",
-    "صحت کی": "سحت کی", "گاؤں کی": "گاؤن کی", "موسم کی": "موسسم کی", "ٹیکنالوجی کی": "ٹکنالوجی کی",
-    "پانی کی": "پانے کی", "کرپشن کی": "کرپسشن کی", "روزگار کی": "روزگارد کی", "سیاحت کی": "سیاحٹ کی",
-    "نوجوانوں کی": "نواجوانوں کی", "زراعت کی": "زراعٹ کی", "صنعت کی": "سنعت کی", "سیلاب کی": "سیلب کی",
-    "ٹرانسپورٹ کی": "ٹرانسپرٹ کی", "خواتین کی": "خواتیں کی", "کھیل کی": "خیل کی", "آلودگی کی": "آلدگی کی",
-    "امید کی": "امد کی", "دوستی کی": "دوستے کی", "زندگی کی": "زندگے کی", "سہولت کی": "سہوللت کی",
-    "اصلاح کی": "اصلح کی"
+# Each model's inference backend (fp32, int8 or bf16) is chosen with <MODEL>_BACKEND
+model_backends = {name: os.environ.get(f"{name.upper()}_BACKEND", "fp32") for name in model_paths}
+
+def load_mt5_tokenizer():
+    """Load the Rust-backed MT5 tokenizer, falling back to the SentencePiece one if it cannot be built."""
+    try:
+        return MT5TokenizerFast.from_pretrained(mt5_paragraph_model_path)
+    except (OSError, ValueError, ImportError) as exc:
+        logger.warning("Fast MT5 tokenizer unavailable (%s), using the slow tokenizer.", exc)
+        return MT5Tokenizer.from_pretrained(mt5_paragraph_model_path, use_fast=False)
+
+def load_mt5_paragraph():
+    tokenizer = load_mt5_tokenizer()
+    model = apply_backend(
+        MT5ForConditionalGeneration.from_pretrained(mt5_paragraph_model_path),
+        model_backends["mt5_paragraph"],
+    )
+    return LoadedModel(tokenizer, model, None)
+
+def load_mt5_sentence():
+    # The sentence model uses the same MT5 tokenizer as the paragraph model
+    tokenizer = load_mt5_tokenizer()
+    model = apply_backend(
+        MT5ForConditionalGeneration.from_pretrained(mt5_sentence_model_path),
+        model_backends["mt5_sentence"],
+    )
+    return LoadedModel(tokenizer, model, None)
+
+def load_bart_paragraph():
+    logger.info("Loading tokenizer from %s...", bart_paragraph_model_path)
+    tokenizer = MBart50TokenizerFast.from_pretrained(bart_paragraph_model_path)
+    urdu_lang_id = tokenizer.lang_code_to_id.get("ur_PK", 250054)  # Default to 250054 if ur_PK not found
+    logger.info("Tokenizer loaded successfully.")
+    logger.info("Loading model from %s...", bart_paragraph_model_path)
+    model = apply_backend(
+        MBartForConditionalGeneration.from_pretrained(bart_paragraph_model_path),
+        model_backends["bart_paragraph"],
+    )
+    logger.info("Model loaded successfully.")
+    # Urdu is forced as the target language
+    return LoadedModel(tokenizer, model, urdu_lang_id)
+
+MODEL_LOADERS = {
+    "mt5_paragraph": load_mt5_paragraph,
+    "mt5_sentence": load_mt5_sentence,
+    "bart_paragraph": load_bart_paragraph,
 }
 
-possessed_noun_errors = {
-    "معیشت": "معشیت", "ترقی": "ترقے", "زندگی": "زندگے", "سہولتیں": "سہولتین", "حالت": "حالتت",
-    "پیداوار": "پیدوار", "سرمایہ": "سرمائہ", "پالیسی": "پالسی", "مہارت": "محارت", "کوشش": "کوشس",
-    "مسکراہٹ": "مسکاہٹ", "خاموشی": "خموشی", "خوشی": "خشی", "یاد": "یادد", "امید": "امد", "دوستی": "دوستے",
-    "سادگی": "سادگے", "سکون": "سکوون", "احساس": "احسس", "شخصیت": "شخسیت", "بنیاد": "بنیادد",
-    "رفتاری": "رفتارے", "چیزوں": "چیزن", "اعتماد": "اعتمد"
-}
-
-sentence_component_errors = {
-    "پاکستان": "پاکستن", "لوگ": "لوک", "کرتے": "کریت", "مسائل": "مسایئل", "مہنگائی": "مہنگای",
-    "حکومت": "حکومٹ", "تعلیم": "تلیم", "صحت": "سحت", "گاؤں": "گاؤن", "موسم": "موسسم", "ٹیکنالوجی": "ٹکنالوجی",
-    "پانی": "پانے", "کرپشن": "کرپسشن", "روزگار": "روزگارد", "سیاحت": "سیاحٹ", "نوجوان": "نواجوان",
-    "زراعت": "زراعٹ", "صنعت": "سنعت", "سیلاب": "سیلب", "ٹرانسپورٹ": "ٹرانسپرٹ", "خواتین": "خواتیں",
-    "کھیل": "خیل", "آلودگی": "آلدگی", "امید": "امد", "دوستی": "دوستے"
-}
-
-subject_errors = {
-    "لوگ": "لوک", "دوست": "دووست", "شخص": "شخس", "حکومت": "حکومٹ", "نوجوان": "نواجوان", "والدین": "والداین",
-    "کسان": "کسسن", "سیاح": "سیح", "مریض": "مرض", "ڈاکٹر": "ڈکٹر", "سیاستدان": "سیاسدان", "طلبہ": "طلباء",
-    "خواتین": "خواتیں", "پاکستان": "پاکستن", "گاؤں": "گاؤن", "شہر": "شہہر", "موسم": "موسسم",
-    "ٹیکنالوجی": "ٹکنالوجی", "پانی": "پانے", "کرپشن": "کرپسشن", "روزگار": "روزگارد", "سیاحت": "سیاحٹ",
-    "زراعت": "زراعٹ", "صنعت": "سنعت", "آلودگی": "آلدگی"
-}
-
-verb_object_errors = {
-    "مسائل": "مسایئل", "مہنگائی": "مہنگای", "تعلیم": "تلیم", "صحت": "سحت", "پانی": "پانے", "کرپشن": "کرپسشن",
-    "روزگار": "روزگارد", "سیاحت": "سیاحٹ", "نوجوان": "نواجوان", "زراعت": "زراعٹ", "صنعت": "سنعت",
-    "سیلاب": "سیلب", "ٹرانسپورٹ": "ٹرانسپرٹ", "خواتین": "خواتیں", "کھیل": "خیل", "آلودگی": "آلدگی",
-    "امید": "امد", "دوستی": "دوستے", "زندگی": "زندگے", "سہولتیں": "سہولتین", "اصلاحات": "اصلحات",
-    "سرمایہ": "سرمائہ", "منصوبے": "منصوبہ", "حقوق": "حقووق", "وسائل": "وسائیل"
-}
-
-# Combine all dictionaries into a list for sequential processing
-error_dictionaries = [
-    ("noun_errors", noun_errors, "اسم کی غلطی", "یہ اسم کی غلطی ہے کیونکہ اس کی ہجے غلط ہے یا اسے غلط استعمال کیا گیا ہے۔"),
-    ("verb_errors", verb_errors, "فعل کی غلطی", "یہ فعل کی غلطی ہے کیونکہ یہ غلط زمانے یا شکل میں ہے۔"),
-    ("pronoun_errors", pronoun_errors, "ضمیر کی غلطی", "یہ ضمیر کی غلطی ہے کیونکہ یہ غلط فاعل یا مفعول کی طرف اشارہ کرتا ہے۔"),
-    ("prepositions_conjunctions_errors", prepositions_conjunctions_errors, "حرف ربط یا حرف جار کی غلطی", "یہ حرف ربط یا حرف جار کی غلطی ہے کیونکہ اسے جملے میں غلط استعمال کیا گیا ہے۔"),
-    ("object_errors", object_errors, "مفعول کی غلطی", "یہ مفعول کی غلطی ہے کیونکہ مفعول کی ہجے غلط ہے یا غلط ہے۔"),
-    ("past_tense_verb_errors", past_tense_verb_errors, "فعل ماضی کی غلطی", "یہ فعل ماضی کی غلطی ہے کیونکہ یہ غلط شکل میں ہے۔"),
-    ("present_tense_verb_errors", present_tense_verb_errors, "فعل حال کی غلطی", "یہ فعل حال کی غلطی ہے کیونکہ یہ غلط شکل میں ہے۔"),
-    ("future_tense_verb_errors", future_tense_verb_errors, "فعل مستقبل کی غلطی", "یہ فعل مستقبل کی غلطی ہے کیونکہ یہ غلط شکل میں ہے۔"),
-    ("singular_errors", singular_errors, "واحد کی غلطی", "یہ واحد اسم کی غلطی ہے کیونکہ اس کی ہجے غلط ہے یا اسے غلط استعمال کیا گیا ہے۔"),
-    ("plural_errors", plural_errors, "جمع کی غلطی", "یہ جمع اسم کی غلطی ہے کیونکہ اس کی ہجے غلط ہے یا اسے غلط استعمال کیا گیا ہے۔"),
-    ("masculine_errors", masculine_errors, "مذکر کی غلطی", "یہ مذکر اسم کی غلطی ہے کیونکہ اس کی ہجے غلط ہے یا اسے غلط استعمال کیا گیا ہے۔"),
-    ("feminine_errors", feminine_errors, "مؤnث کی غلطی", "یہ مؤnث اسم کی غلطی ہے کیونکہ اس کی ہجے غلط ہے یا اسے غلط استعمال کیا گیا ہے۔"),
-    ("direct_object_errors", direct_object_errors, "مفعول مستقیم کی غلطی", "یہ مفعول مستقیم کی غلطی ہے کیونکہ اس کی ہجے غلط ہے یا غلط ہے۔"),
-    ("indirect_object_errors", indirect_object_errors, "مفعول غیر مستقیم کی غلطی", "یہ مفعول غیر مستقیم کی غلطی ہے کیونکہ اسے غلط استعمال کیا گیا ہے۔"),
-    ("adverb_errors", adverb_errors, "متعلق فعل کی غلطی", "یہ متعلق فعل کی غلطی ہے کیونکہ اس کی ہجے غلط ہے یا اسے غلط استعمال کیا گیا ہے۔"),
-    ("possessive_noun_errors", possessive_noun_errors, "اسم ملکیتی کی غلطی", "یہ اسم ملکیتی کی غلطی ہے کیونکہ اس کی ہجے غلط ہے یا غلط ہے۔"),
-    ("possessed_noun_errors", possessed_noun_errors, "اسم مملوک کی غلطی", "یہ اسم مملوک کی غلطی ہے کیونکہ اس کی ہجے غلط ہے یا غلط ہے۔"),
-    ("sentence_component_errors", sentence_component_errors, "جملہ کے جزو کی غلطی", "یہ جملہ کے جزو کی غلطی ہے کیونکہ اسے غلط استعمال کیا گیا ہے۔"),
-    ("subject_errors", subject_errors, "فاعل کی غلطی", "یہ فاعل کی غلطی ہے کیونکہ اس کی ہجے غلط ہے یا غلط ہے۔"),
-    ("verb_object_errors", verb_object_errors, "فعل اور مفعول کی غلطی", "یہ فعل اور مفعول کی غلطی ہے کیونکہ مفعول فعل کے ساتھ مطابقت نہیں رکھتا۔")
+# ENABLED_MODELS limits which models this deployment serves; MODEL_IDLE_TTL_SECONDS > 0
+# unloads a model after it has gone unused for that long
+enabled_models = [
+    name.strip() for name in os.environ.get("ENABLED_MODELS", ",".join(MODEL_LOADERS)).split(",") if name.strip()
 ]
-
-def detect_errors(input_text, corrected_text):
+model_registry = ModelRegistry(idle_ttl=float(os.environ.get("MODEL_IDLE_TTL_SECONDS", "0")))
+for name in enabled_models:
+    model_registry.register(name, MODEL_LOADERS[name])
+
+# The error dictionaries are data: LEXICON_DIR holds one TSV file per dictionary, listed with its error
+# type and reason in dictionaries.json (see lexicon.py), compiled into LEXICON_PATH and memory-mapped.
+# Edited dictionaries are picked up without a restart by POST /lexicon/reload or, every
+# LEXICON_RELOAD_SECONDS (0 disables), by each worker checking whether the files changed
+lexicon_dir = os.environ.get("LEXICON_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "lexicon"))
+lexicon_path = os.environ.get("LEXICON_PATH", os.path.join(lexicon_dir, "lexicon.bin"))
+lexicon_reload_seconds = float(os.environ.get("LEXICON_RELOAD_SECONDS", "10"))
+error_lexicon = load_lexicon(lexicon_dir, lexicon_path)
+
+def refresh_lexicon(rebuild=False):
+    """
+    Recompile the lexicon if its sources changed (always with `rebuild`) and switch to the compiled
+    file if it changed. Requests already running keep the lexicon they started with. Returns whether
+    the lexicon's content changed.
+    """
+    global error_lexicon
+    if not rebuild and error_lexicon.is_current() and not error_lexicon.sources_changed(lexicon_dir):
+        return False
+    previous, error_lexicon = error_lexicon, load_lexicon(lexicon_dir, lexicon_path, rebuild=rebuild)
+    if error_lexicon.checksum == previous.checksum:
+        return False
+    logger.info("Loaded error lexicon %s: %d entries for %d words", error_lexicon.checksum, error_lexicon.entry_count, error_lexicon.key_count)
+    return True
+
+# Characters that may follow an incorrect stem (case and number endings)
+SUFFIX_CHARS = frozenset('ںےکیکوسےمیںوں')
+
+def lookup_error_entries(word, lexicon=None):
+    """
+    Find dictionary entries whose incorrect word is a prefix of `word` followed only by suffix characters.
+    Returns (incorrect_word, suffix, dict_name, correct_word, error_type, reason) tuples in dictionary order.
+    """
+    lexicon = lexicon or error_lexicon
+    # Only the trailing run of suffix characters can be split off as a suffix
+    stem_end = len(word)
+    while stem_end > 0 and word[stem_end - 1] in SUFFIX_CHARS:
+        stem_end -= 1
+
+    matches = []
+    for end in range(max(stem_end, 1), len(word) + 1):
+        stem = word[:end]
+        for order, dict_name, correct_word, error_type, reason in lexicon.entries(stem):
+            matches.append((order, stem, word[end:], dict_name, correct_word, error_type, reason))
+    matches.sort(key=lambda match: match[0])
+    return [match[1:] for match in matches]
+
+def detect_errors(input_text, corrected_text, word_offset=0):
     """
     Detect errors by comparing input text with corrected text using sequence alignment.
     Identifies errors corrected by the model according to error dictionaries.
-    Returns a list of unique detected errors with explanations and reasons in Urdu.
+    Returns a list of unique detected errors with explanations and reasons in Urdu; each error's
+    `word_index` is the position of the incorrect word among the input's words. `word_offset`
+    is the position of the first input word in the full text when input_text is one sentence
+    of a longer paragraph, so indexes refer to the whole paragraph.
     """
     detected_errors = []
     seen_errors = set()  # To avoid duplicates
+    lexicon = error_lexicon  # One version of the lexicon for the whole text, even if it is reloaded meanwhile
 
     # Normalize Unicode to handle encoding variations
     input_text = unicodedata.normalize('NFC', input_text)
@@ -262,15 +194,14 @@ def detect_errors(input_text, corrected_text):
     corrected_words = re.findall(r'\S+', corrected_text)
 
     # Log tokenized words for debugging
-    print("Input words:", input_words)
-    print("Corrected words:", corrected_words)
+    logger.debug("Input words: %s", input_words)
+    logger.debug("Corrected words: %s", corrected_words)
 
-    # Use SequenceMatcher to align input and corrected words
-    matcher = SequenceMatcher(None, input_words, corrected_words)
-    matches = matcher.get_opcodes()
+    # Align input and corrected words (linear in paragraph length for typical corrections)
+    matches = get_opcodes(input_words, corrected_words)
 
     # Log alignment operations
-    print("Alignment operations:", matches)
+    logger.debug("Alignment operations: %s", matches)
 
     # Process alignment operations
     for tag, i1, i2, j1, j2 in matches:
@@ -278,151 +209,688 @@ def detect_errors(input_text, corrected_text):
             # Words match, no error
             continue
         elif tag == 'replace':
-            # Words differ, check for errors
-            for i in range(i1, i2):
+            # Words differ, check for errors; words pair up by position within the replaced span
+            paired = min(i2 - i1, j2 - j1)
+            for i in range(i1, i1 + paired):
                 input_word = unicodedata.normalize('NFC', input_words[i])
                 corrected_word = unicodedata.normalize('NFC', corrected_words[j1 + (i - i1)])
-                print(f"Comparing replace at input[{i}]={input_word} -> corrected[{j1 + (i - i1)}]={corrected_word}")
-                for dict_name, error_dict, error_type, reason in error_dictionaries:
-                    if dict_name in ["indirect_object_errors", "possessive_noun_errors", "adverb_errors"]:
-                        for correct_word, incorrect_word in error_dict.items():
-                            if input_word == incorrect_word and corrected_word == correct_word:
-                                error_key = f"{incorrect_word}_{correct_word}_{dict_name}_{i}"
-                                if error_key not in seen_errors:
-                                    explanation = {
-                                        "incorrect": incorrect_word,
-                                        "correct": correct_word,
-                                        "error_type": error_type,
-                                        "description": f"غلط لفظ '{incorrect_word}' استعمال ہوا، صحیح لفظ '{correct_word}' ہونا چاہیے۔",
-                                        "reason": reason
-                                    }
-                                    detected_errors.append(explanation)
-                                    seen_errors.add(error_key)
-                                    print(f"Detected phrase error: {explanation}")
-                    else:
-                        for correct_word, incorrect_word in error_dict.items():
-                            pattern = r'^' + re.escape(incorrect_word) + r'([ںےکیکوسےمیںوں]*)$'
-                            input_match = re.match(pattern, input_word)
-                            if input_match:
-                                suffix = input_match.group(1)
-                                if corrected_word == correct_word + suffix:
-                                    error_key = f"{input_word}_{corrected_word}_{dict_name}_{i}"
-                                    if error_key not in seen_errors:
-                                        explanation = {
-                                            "incorrect": input_word,
-                                            "correct": corrected_word,
-                                            "error_type": error_type,
-                                            "description": f"غلط لفظ '{input_word}' استعمال ہوا، صحیح لفظ '{corrected_word}' ہونا چاہیے۔",
-                                            "reason": reason
-                                        }
-                                        detected_errors.append(explanation)
-                                        seen_errors.add(error_key)
-                                        print(f"Detected error: {explanation}")
-        elif tag == 'delete':
-            # Input word was omitted, check if it was incorrect
-            for i in range(i1, i2):
-                input_word = unicodedata.normalize('NFC', input_words[i])
-                print(f"Checking deleted input[{i}]={input_word}")
-                for dict_name, error_dict, error_type, reason in error_dictionaries:
-                    for correct_word, incorrect_word in error_dict.items():
-                        pattern = r'^' + re.escape(incorrect_word) + r'([ںےکیکوسےمیںوں]*)$'
-                        input_match = re.match(pattern, input_word)
-                        if input_match:
-                            suffix = input_match.group(1)
-                            expected_correct = correct_word + suffix
-                            error_key = f"{input_word}_{expected_correct}_{dict_name}_{i}"
+                logger.debug("Comparing replace at input[%d]=%s -> corrected[%d]=%s", i, input_word, j1 + (i - i1), corrected_word)
+                for incorrect_word, suffix, dict_name, correct_word, error_type, reason in lookup_error_entries(input_word, lexicon):
+                    if dict_name in lexicon.exact_match:
+                        if suffix == "" and corrected_word == correct_word:
+                            error_key = f"{incorrect_word}_{correct_word}_{dict_name}_{word_offset + i}"
                             if error_key not in seen_errors:
                                 explanation = {
-                                    "incorrect": input_word,
-                                    "correct": expected_correct,
+                                    "incorrect": incorrect_word,
+                                    "correct": correct_word,
                                     "error_type": error_type,
-                                    "description": f"غلط لفظ '{input_word}' استعمال ہوا، صحیح لفظ '{expected_correct}' ہونا چاہیے۔",
-                                    "reason": reason
+                                    "description": f"غلط لفظ '{incorrect_word}' استعمال ہوا، صحیح لفظ '{correct_word}' ہونا چاہیے۔",
+                                    "reason": reason,
+                                    "word_index": word_offset + i
                                 }
                                 detected_errors.append(explanation)
                                 seen_errors.add(error_key)
-                                print(f"Detected omitted word error: {explanation}")
+                                logger.debug("Detected phrase error: %s", explanation)
+                    elif corrected_word == correct_word + suffix:
+                        error_key = f"{input_word}_{corrected_word}_{dict_name}_{word_offset + i}"
+                        if error_key not in seen_errors:
+                            explanation = {
+                                "incorrect": input_word,
+                                "correct": corrected_word,
+                                "error_type": error_type,
+                                "description": f"غلط لفظ '{input_word}' استعمال ہوا، صحیح لفظ '{corrected_word}' ہونا چاہیے۔",
+                                "reason": reason,
+                                "word_index": word_offset + i
+                            }
+                            detected_errors.append(explanation)
+                            seen_errors.add(error_key)
+                            logger.debug("Detected error: %s", explanation)
+            # Input words beyond the corrected side of the span have no counterpart, like deleted words
+            omitted = range(i1 + paired, i2)
+        elif tag == 'delete':
+            omitted = range(i1, i2)
         elif tag == 'insert':
             # Corrected text added a word, skip for error detection
-            print(f"Inserted words at corrected[{j1}:{j2}]={corrected_words[j1:j2]}")
+            logger.debug("Inserted words at corrected[%d:%d]=%s", j1, j2, corrected_words[j1:j2])
+            continue
+
+        # Input word was omitted, check if it was incorrect
+        for i in omitted:
+            input_word = unicodedata.normalize('NFC', input_words[i])
+            logger.debug("Checking deleted input[%d]=%s", i, input_word)
+            for incorrect_word, suffix, dict_name, correct_word, error_type, reason in lookup_error_entries(input_word, lexicon):
+                expected_correct = correct_word + suffix
+                error_key = f"{input_word}_{expected_correct}_{dict_name}_{word_offset + i}"
+                if error_key not in seen_errors:
+                    explanation = {
+                        "incorrect": input_word,
+                        "correct": expected_correct,
+                        "error_type": error_type,
+                        "description": f"غلط لفظ '{input_word}' استعمال ہوا، صحیح لفظ '{expected_correct}' ہونا چاہیے۔",
+                        "reason": reason,
+                        "word_index": word_offset + i
+                    }
+                    detected_errors.append(explanation)
+                    seen_errors.add(error_key)
+                    logger.debug("Detected omitted word error: %s", explanation)
 
     return detected_errors
 
+# Optional pre-screen (PRESCREEN=1): texts of at most PRESCREEN_MAX_WORDS words with no word matching an
+# incorrect dictionary entry are returned unchanged without generation. PRESCREEN_IGNORE_DICTS lists
+# dictionaries that should not count as matches.
+prescreen = Prescreen(
+    lookup_error_entries,
+    enabled=os.environ.get("PRESCREEN", "0").lower() in ("1", "true", "yes", "on"),
+    max_words=int(os.environ.get("PRESCREEN_MAX_WORDS", "20")),
+    ignore_dicts=[name.strip() for name in os.environ.get("PRESCREEN_IGNORE_DICTS", "").split(",") if name.strip()],
+)
+
+def skip_generation(name, input_text):
+    """Run the pre-screen for one text and record the outcome."""
+    skipped = prescreen.should_skip(input_text)
+    if prescreen.enabled:
+        metrics.inc("urdu_correct_prescreen_total", model=name, result="skipped" if skipped else "generated")
+    return skipped
+
 class SentenceInput(BaseModel):
     input_text: str
 
-@app.post("/mt5_paragraph")
-async def mt5_paragraph(input_data: SentenceInput):
-    input_text = input_data.input_text
-    
-    # Tokenize and correct the paragraph using the fine-tuned MT5 model
-    prompt = "جملے کی درستگی: " + input_text
-    inputs = mt5_paragraph_tokenizer(prompt, return_tensors="pt", padding=True, truncation=True, max_length=512)
+class CorrectionInput(SentenceInput):
+    # "beam" (full beam search), "fast" (greedy / low-beam) or "auto" (fast, escalating to beam when it changes the text)
+    decoding: Literal["beam", "fast", "auto"] = "beam"
+    # With a budget, beam decoding drops to the fast tier while the model's recent beam latency exceeds it
+    latency_budget_ms: float | None = None
+
+class ParagraphInput(CorrectionInput):
+    # Correct each sentence separately (batched together) instead of the whole paragraph at once
+    segment_sentences: bool = False
+
+class BatchItem(BaseModel):
+    id: str
+    input_text: str
+
+class BatchInput(BaseModel):
+    items: list[BatchItem]
+    decoding: Literal["beam", "fast", "auto"] = "beam"
+    latency_budget_ms: float | None = None
+
+PROMPT_PREFIX = "جملے کی درستگی: "
+
+# The prompt prefix is tokenized once per tokenizer and text token ids are memoized;
+# TOKENIZER_CACHE_SIZE bounds the memo per tokenizer (0 disables it)
+tokenizer_cache_size = int(os.environ.get("TOKENIZER_CACHE_SIZE", "4096"))
+
+# Decoding tiers and the length-aware output budget; the policy's settings are part of the correction cache key
+decoding_policy = DecodingPolicy(
+    beams=int(os.environ.get("DECODE_BEAMS", "5")),
+    fast_beams=int(os.environ.get("FAST_DECODE_BEAMS", "1")),
+    length_ratio=float(os.environ.get("DECODE_LENGTH_RATIO", "1.5")),
+    length_slack=int(os.environ.get("DECODE_LENGTH_SLACK", "10")),
+    # Beam latency estimates older than this are re-measured by letting one budgeted request run beam
+    estimate_max_age=float(os.environ.get("BEAM_LATENCY_MAX_AGE_SECONDS", "60")),
+)
+
+def generate_corrections(tokenizer, model, texts, decoder_start_id=None, model_name=None, tier="beam"):
+    """
+    Correct a batch of texts with one padded generate call using the 'beam' or 'fast' decoding tier.
+    Returns the decoded corrections in the same order as `texts`.
+    Stage timings and token counts are recorded under `model_name` when it is given.
+    """
+    labels = {"model": model_name or "unlabelled"}
+    with metrics.timer("urdu_correct_stage_seconds", stage="tokenize", **labels):
+        inputs = prompt_tokenizer_for(tokenizer, PROMPT_PREFIX, cache_size=tokenizer_cache_size)(texts)
+    if decoder_start_id is not None:
+        # Force the target language token as the first decoder input for every row
+        inputs["decoder_input_ids"] = torch.full((len(texts), 1), decoder_start_id, dtype=torch.long)
+    input_lengths = inputs["attention_mask"].sum(dim=1).tolist()
+    # The longest text in the batch sets the output budget
+    generation_params = decoding_policy.generation_params(tier, max(input_lengths))
+
+    start = time.perf_counter()
     with torch.no_grad():
-        outputs = mt5_paragraph_model.generate(
-            **inputs,
-            max_length=512,
-            num_beams=5,
-            early_stopping=True
+        outputs = model.generate(**inputs, **generation_params)
+    elapsed = time.perf_counter() - start
+    metrics.observe("urdu_correct_stage_seconds", elapsed, stage="generate", **labels)
+    decoding_policy.observe(labels["model"], tier, elapsed)
+
+    with metrics.timer("urdu_correct_stage_seconds", stage="decode", **labels):
+        corrections = tokenizer.batch_decode(outputs, skip_special_tokens=True)
+
+    metrics.inc("urdu_correct_generate_calls_total", num_beams=generation_params["num_beams"], **labels)
+    for count in input_lengths:
+        metrics.observe("urdu_correct_input_tokens", count, **labels)
+    for count in (outputs != tokenizer.pad_token_id).sum(dim=1).tolist():
+        metrics.observe("urdu_correct_output_tokens", count, **labels)
+    return corrections
+
+def generate_streamed(name, loaded, input_text, streamer):
+    """Correct one text greedily, pushing decoded words to `streamer` as they are generated."""
+    inputs = prompt_tokenizer_for(loaded.tokenizer, PROMPT_PREFIX, cache_size=tokenizer_cache_size)([input_text])
+    if loaded.decoder_start_id is not None:
+        inputs["decoder_input_ids"] = torch.tensor([[loaded.decoder_start_id]])
+    # transformers streamers only support greedy decoding, so streamed corrections use one beam
+    generation_params = {"max_new_tokens": decoding_policy.max_new_tokens(inputs["input_ids"].shape[1]), "num_beams": 1}
+    metrics.inc("urdu_correct_generate_calls_total", num_beams=1, model=name)
+    try:
+        with metrics.timer("urdu_correct_stage_seconds", stage="generate", model=name), torch.no_grad():
+            outputs = loaded.model.generate(**inputs, **generation_params, streamer=streamer)
+    except Exception:
+        streamer.abort()
+        raise
+    return loaded.tokenizer.decode(outputs[0], skip_special_tokens=True)
+
+def generate_with(name, items):
+    """
+    Correct a batch of (text, tier) items with the named model, loading it first if needed.
+    Items are grouped so each decoding tier gets its own generate call.
+    """
+    corrections = [None] * len(items)
+    with model_registry.use(name) as loaded:
+        for tier in sorted({tier for _, tier in items}):
+            positions = [position for position, (_, item_tier) in enumerate(items) if item_tier == tier]
+            outputs = generate_corrections(
+                loaded.tokenizer, loaded.model, [items[position][0] for position in positions],
+                decoder_start_id=loaded.decoder_start_id, model_name=name, tier=tier,
+            )
+            for position, output in zip(positions, outputs):
+                corrections[position] = output
+    return corrections
+
+# Micro-batching: concurrent requests for the same model share one generate call
+batch_max_size = int(os.environ.get("BATCH_MAX_SIZE", "8"))
+batch_window_ms = float(os.environ.get("BATCH_WINDOW_MS", "10"))
+
+# Inference runs on a bounded thread pool so generate never blocks the event loop.
+# MODEL_CONCURRENCY caps the batches in flight per model and MAX_QUEUE_SIZE the requests
+# waiting per model; beyond that requests are rejected with 503 instead of piling up.
+# A /batch request needs only some room in the queue (see MAX_BATCH_ITEMS below).
+model_concurrency = int(os.environ.get("MODEL_CONCURRENCY", "1"))
+max_queue_size = int(os.environ.get("MAX_QUEUE_SIZE", "64"))
+inference_executor = ThreadPoolExecutor(
+    max_workers=int(os.environ.get("INFERENCE_THREADS", str(len(enabled_models) * model_concurrency))),
+    thread_name_prefix="inference",
+)
+# Streamed corrections generate one text at a time outside the batchers, on their own pool so
+# long streams never hold the threads batched traffic runs on. Each model admits MODEL_CONCURRENCY
+# streams at once with up to MAX_QUEUE_SIZE more waiting, and answers 503 beyond that.
+stream_executor = ThreadPoolExecutor(
+    max_workers=int(os.environ.get("STREAM_THREADS", str(len(enabled_models) * model_concurrency))),
+    thread_name_prefix="stream",
+)
+stream_slots = {
+    name: StreamSlots(name, concurrency=model_concurrency, max_queue_size=max_queue_size) for name in enabled_models
+}
+if os.environ.get("TORCH_NUM_THREADS"):
+    # Intra-op threads per generate call; keep threads x concurrency within the available cores
+    torch.set_num_threads(int(os.environ["TORCH_NUM_THREADS"]))
+
+# With INFERENCE_SOCKET set this process is one of several HTTP workers: the models live in a
+# single inference process (inference_server.py) listening on that Unix socket, and generation
+# requests are forwarded to its batchers instead of running here
+inference_socket = os.environ.get("INFERENCE_SOCKET")
+inference_client = InferenceClient(inference_socket) if inference_socket else None
+remote_model_stats = {}  # model -> registry stats from the inference process's latest reply about it
+
+def adopt_inference_reply(name, reply):
+    """Keep the inference process's view of a model: its registry stats and beam latency."""
+    remote_model_stats[name] = reply["model"]
+    decoding_policy.adopt(name, reply["beam_latency"])
+
+async def inference_request(message):
+    try:
+        return await inference_client.request(message)
+    except ConnectionError as exc:
+        raise HTTPException(status_code=503, detail=str(exc), headers={"Retry-After": "1"})
+
+if inference_client is not None:
+    batchers = {name: RemoteBatcher(name, inference_client, on_reply=adopt_inference_reply) for name in enabled_models}
+else:
+    batchers = {
+        name: MicroBatcher(
+            name,
+            functools.partial(generate_with, name),
+            max_batch_size=batch_max_size,
+            max_wait_ms=batch_window_ms,
+            executor=inference_executor,
+            concurrency=model_concurrency,
+            max_queue_size=max_queue_size,
         )
-    corrected_text = mt5_paragraph_tokenizer.decode(outputs[0], skip_special_tokens=True)
-    
-    # Detect errors by comparing input and corrected text
-    errors = detect_errors(input_text, corrected_text)
-    
+        for name in enabled_models
+    }
+
+def get_batcher(name):
+    if name not in batchers:
+        raise HTTPException(status_code=404, detail=f"Model '{name}' is not enabled on this server")
+    return batchers[name]
+
+# Correction cache in front of generation; CACHE_MAX_ENTRIES=0 disables it and
+# CACHE_PATH keeps entries in a sqlite file across restarts, holding at most CACHE_DISK_MAX_ENTRIES
+correction_cache = CorrectionCache(
+    max_entries=int(os.environ.get("CACHE_MAX_ENTRIES", "1024")),
+    ttl_seconds=float(os.environ.get("CACHE_TTL_SECONDS", "3600")),
+    path=os.environ.get("CACHE_PATH"),
+    disk_max_entries=int(os.environ.get("CACHE_DISK_MAX_ENTRIES", "100000")),
+)
+
+async def detect_errors_off_loop(model_name, detect, *args):
+    """Run error detection in a worker thread, timed as the model's detect_errors stage."""
+    with metrics.timer("urdu_correct_stage_seconds", stage="detect_errors", model=model_name):
+        return await asyncio.to_thread(detect, *args)
+
+def same_words(text, other):
+    return re.findall(r'\S+', unicodedata.normalize('NFC', text)) == re.findall(r'\S+', unicodedata.normalize('NFC', other))
+
+async def generate_texts(batcher, texts, mode):
+    """
+    Generate corrections for texts with the decoding mode. In 'auto' mode every text gets a
+    fast pass and only the texts it changed are generated again with full beam search.
+    """
+    try:
+        if mode != "auto":
+            return await batcher.submit_many([(text, mode) for text in texts])
+
+        corrected_texts = await batcher.submit_many([(text, "fast") for text in texts])
+        changed = [index for index, (text, corrected_text) in enumerate(zip(texts, corrected_texts))
+                   if not same_words(text, corrected_text)]
+        if changed:
+            metrics.inc("urdu_correct_escalations_total", len(changed), model=batcher.name)
+            escalated = await batcher.submit_many([(texts[index], "beam") for index in changed])
+            for index, corrected_text in zip(changed, escalated):
+                corrected_texts[index] = corrected_text
+        return corrected_texts
+    except (QueueFullError, ConnectionError) as exc:
+        raise HTTPException(status_code=503, detail=str(exc), headers={"Retry-After": "1"})
+
+async def correct_text(batcher, input_text, mode="beam"):
+    """Correct one text through the model's batcher and detect errors against the input."""
+    corrected_text, = await generate_texts(batcher, [input_text], mode)
+
+    # Detect errors by comparing input and corrected text, off the event loop
+    errors = await detect_errors_off_loop(batcher.name, detect_errors, input_text, corrected_text)
+
     return {
-        "input_text": input_text,
         "corrected_text": corrected_text,
         "errors": errors
     }
 
-@app.post("/mt5_sentence")
-async def mt5_sentence(input_data: SentenceInput):
-    input_text = input_data.input_text
-    
-    # Tokenize and correct the sentence using the fine-tuned MT5 model
-    prompt = "جملے کی درستگی: " + input_text
-    inputs = mt5_sentence_tokenizer(prompt, return_tensors="pt", padding=True, truncation=True, max_length=512)
-    with torch.no_grad():
-        outputs = mt5_sentence_model.generate(
-            **inputs,
-            max_length=512,
-            num_beams=5,
-            early_stopping=True
-        )
-    corrected_text = mt5_sentence_tokenizer.decode(outputs[0], skip_special_tokens=True)
-    
-    # Detect errors by comparing input and corrected text
-    errors = detect_errors(input_text, corrected_text)
-    
+def detect_segment_errors(input_text, spans, corrected_segments):
+    """Detect errors sentence by sentence, keeping word positions relative to the whole paragraph."""
+    errors = []
+    word_offset = 0
+    last = 0
+    for (start, end), corrected_segment in zip(spans, corrected_segments):
+        word_offset += len(re.findall(r'\S+', input_text[last:start]))
+        segment = input_text[start:end]
+        errors.extend(detect_errors(segment, corrected_segment, word_offset=word_offset))
+        word_offset += len(re.findall(r'\S+', segment))
+        last = end
+    return errors
+
+async def correct_segmented(batcher, input_text, mode="beam"):
+    """
+    Correct a paragraph sentence by sentence. The sentences are queued together so they are
+    generated as padded batches, then stitched back between the original separators.
+    """
+    spans = sentence_spans(input_text)
+    corrected_segments = await generate_texts(batcher, [input_text[start:end] for start, end in spans], mode)
+    corrected_text = stitch(input_text, spans, corrected_segments)
+
+    errors = await detect_errors_off_loop(batcher.name, detect_segment_errors, input_text, spans, corrected_segments)
+
     return {
-        "input_text": input_text,
         "corrected_text": corrected_text,
         "errors": errors
     }
 
+def correction_params(name, mode):
+    # Cached results are only valid for the checkpoint and backend that generated them (the persistent
+    # cache outlives a redeploy that changes either) and, as they include the detected errors, the lexicon
+    return dict(
+        decoding_policy.cache_params(mode),
+        checkpoint=model_paths[name], backend=model_backends[name], lexicon=error_lexicon.checksum,
+    )
+
+def correction_key(name, input_text, mode="beam", segment_sentences=False):
+    params = dict(correction_params(name, mode), segment_sentences=segment_sentences)
+    return correction_cache.make_key(name, input_text, params)
+
+async def correct_with(batcher, input_text, segment_sentences=False, decoding="beam", latency_budget_ms=None):
+    """Serve a correction from the cache, generating it on a miss."""
+    if skip_generation(batcher.name, input_text):
+        return {
+            "input_text": input_text,
+            "corrected_text": input_text,
+            "errors": [],
+            "generation_skipped": True
+        }
+
+    mode = decoding_policy.choose(batcher.name, decoding, latency_budget_ms)
+    metrics.inc("urdu_correct_decoding_total", model=batcher.name, mode=mode)
+    key = correction_key(batcher.name, input_text, mode, segment_sentences)
+    correct = correct_segmented if segment_sentences else correct_text
+    correction = await correction_cache.get_or_compute(key, lambda: correct(batcher, input_text, mode))
+
+    return {
+        "input_text": input_text,
+        "corrected_text": correction["corrected_text"],
+        "errors": correction["errors"],
+        "generation_skipped": False
+    }
+
+@app.post("/mt5_paragraph")
+async def mt5_paragraph(input_data: ParagraphInput):
+    # Correct the paragraph using the fine-tuned MT5 model
+    return await correct_with(
+        get_batcher("mt5_paragraph"), input_data.input_text, input_data.segment_sentences,
+        input_data.decoding, input_data.latency_budget_ms,
+    )
+
+@app.post("/mt5_sentence")
+async def mt5_sentence(input_data: CorrectionInput):
+    # Correct the sentence using the fine-tuned MT5 model
+    return await correct_with(
+        get_batcher("mt5_sentence"), input_data.input_text,
+        decoding=input_data.decoding, latency_budget_ms=input_data.latency_budget_ms,
+    )
+
 @app.post("/bart_paragraph")
-async def bart_paragraph(input_data: SentenceInput):
-    input_text = input_data.input_text
-    
-    # Tokenize and correct the paragraph using the fine-tuned mBART model
-    prompt = "جملے کی درستگی: " + input_text
-    inputs = bart_paragraph_tokenizer(prompt, return_tensors="pt", padding=True, truncation=True, max_length=512)
-    inputs["decoder_input_ids"] = torch.tensor([[urdu_lang_id]])  # Set Urdu as target language
-    with torch.no_grad():
-        outputs = bart_paragraph_model.generate(
-            **inputs,
-            max_length=512,
-            num_beams=5,
-            early_stopping=True
-        )
-    corrected_text = bart_paragraph_tokenizer.decode(outputs[0], skip_special_tokens=True)
-    
-    # Detect errors by comparing input and corrected text
-    errors = detect_errors(input_text, corrected_text)
-    
+async def bart_paragraph(input_data: ParagraphInput):
+    # Correct the paragraph using the fine-tuned mBART model
+    return await correct_with(
+        get_batcher("bart_paragraph"), input_data.input_text, input_data.segment_sentences,
+        input_data.decoding, input_data.latency_budget_ms,
+    )
+
+# Largest number of texts accepted by one /batch request. It may exceed MAX_QUEUE_SIZE: a batch is
+# admitted whenever its model's queue has room, takes the room that is left and queues each of
+# its remaining texts as an earlier one finishes, so bulk jobs are not starved by mixed traffic.
+max_batch_items = int(os.environ.get("MAX_BATCH_ITEMS", "256"))
+
+async def correct_batch(batcher, items, decoding="beam", latency_budget_ms=None):
+    """
+    Correct many texts in one request. Cached texts are served directly; the rest are
+    de-duplicated, sorted by length so each generate batch pads to similar lengths, and
+    queued together. Results come back in input order.
+    """
+    if len(items) > max_batch_items:
+        raise HTTPException(status_code=413, detail=f"At most {max_batch_items} items are accepted per batch")
+
+    mode = decoding_policy.choose(batcher.name, decoding, latency_budget_ms)
+    metrics.inc("urdu_correct_decoding_total", model=batcher.name, mode=mode)
+    corrections = {}
+    pending = {}  # cache key -> indices of the items with that text
+    skipped = set()
+    for index, item in enumerate(items):
+        if skip_generation(batcher.name, item.input_text):
+            skipped.add(index)
+            corrections[index] = {"corrected_text": item.input_text, "errors": []}
+            continue
+        key = correction_key(batcher.name, item.input_text, mode)
+        if key in pending:
+            pending[key].append(index)
+            continue
+        cached = correction_cache.get(key)
+        if cached is not None:
+            corrections[index] = cached
+        else:
+            pending[key] = [index]
+
+    # Shortest texts first so neighbouring texts end up in the same padded batch
+    pending_keys = sorted(pending, key=lambda key: len(items[pending[key][0]].input_text))
+    texts = [items[pending[key][0]].input_text for key in pending_keys]
+    corrected_texts = await generate_texts(batcher, texts, mode)
+
+    errors = await detect_errors_off_loop(
+        batcher.name, lambda: [detect_errors(text, corrected_text) for text, corrected_text in zip(texts, corrected_texts)]
+    )
+    for key, corrected_text, text_errors in zip(pending_keys, corrected_texts, errors):
+        correction = {"corrected_text": corrected_text, "errors": text_errors}
+        correction_cache.put(key, correction)
+        for index in pending[key]:
+            corrections[index] = correction
+
     return {
+        "results": [
+            {
+                "id": item.id,
+                "input_text": item.input_text,
+                "corrected_text": corrections[index]["corrected_text"],
+                "errors": corrections[index]["errors"],
+                "generation_skipped": index in skipped
+            }
+            for index, item in enumerate(items)
+        ]
+    }
+
+@app.post("/mt5_paragraph/batch")
+async def mt5_paragraph_batch(input_data: BatchInput):
+    # Correct many paragraphs with the fine-tuned MT5 model
+    return await correct_batch(get_batcher("mt5_paragraph"), input_data.items, input_data.decoding, input_data.latency_budget_ms)
+
+@app.post("/mt5_sentence/batch")
+async def mt5_sentence_batch(input_data: BatchInput):
+    # Correct many sentences with the fine-tuned MT5 model
+    return await correct_batch(get_batcher("mt5_sentence"), input_data.items, input_data.decoding, input_data.latency_budget_ms)
+
+@app.post("/bart_paragraph/batch")
+async def bart_paragraph_batch(input_data: BatchInput):
+    # Correct many paragraphs with the fine-tuned mBART model
+    return await correct_batch(get_batcher("bart_paragraph"), input_data.items, input_data.decoding, input_data.latency_budget_ms)
+
+async def stream_generation(name, input_text):
+    """
+    Generate a correction greedily in this process. Yields {"admitted": True} once the stream
+    has one of the model's stream slots (raising QueueFullError if none is free and the wait
+    queue is full), then {"text": ...} for each decoded piece and finally {"done": corrected_text}.
+    """
+    async with stream_slots[name].slot():
+        yield {"admitted": True}
+        loop = asyncio.get_running_loop()
+        # The streamer needs the tokenizer, so load the model (off the event loop) before generating
+        loaded = await loop.run_in_executor(stream_executor, model_registry.acquire, name)
+        try:
+            streamer = AsyncTextStreamer(loaded.tokenizer, loop, skip_special_tokens=True)
+            generation = loop.run_in_executor(stream_executor, generate_streamed, name, loaded, input_text, streamer)
+            while True:
+                text, stream_end = await streamer.queue.get()
+                if text:
+                    yield {"text": text}
+                if stream_end:
+                    break
+            yield {"done": await generation}
+        finally:
+            model_registry.release(name)
+
+async def stream_correction_events(name, input_text, key, correction, pieces):
+    """
+    Yield Server-Sent Events for a streamed correction: `partial` events with the corrected text
+    so far, then a `done` event with the full result (or an `error` event if generation fails).
+    `correction` is the cached result, or None to build it from `pieces`, an already admitted stream.
+    """
+    if correction is None:
+        partial_text = ""
+        try:
+            async for piece in pieces:
+                if "text" in piece:
+                    partial_text += piece["text"]
+                    yield sse_event("partial", {"corrected_text": partial_text})
+                elif "done" in piece:
+                    corrected_text = piece["done"]
+                    if "model" in piece:
+                        # The inference process's view of the model that served the stream
+                        remote_model_stats[name] = piece["model"]
+        except Exception as exc:
+            yield sse_event("error", {"detail": str(exc)})
+            return
+
+        errors = await detect_errors_off_loop(name, detect_errors, input_text, corrected_text)
+        correction = {"corrected_text": corrected_text, "errors": errors}
+        correction_cache.put(key, correction)
+
+    yield sse_event("done", {
         "input_text": input_text,
-        "corrected_text": corrected_text,
-        "errors": errors
+        "corrected_text": correction["corrected_text"],
+        "errors": correction["errors"]
+    })
+
+async def stream_response(name, input_text):
+    if name not in model_registry:
+        raise HTTPException(status_code=404, detail=f"Model '{name}' is not enabled on this server")
+    key = correction_cache.make_key(name, input_text, correction_params(name, "stream"))
+    correction = correction_cache.get(key)
+    pieces = None
+    if correction is None:
+        if inference_client is not None:
+            pieces = inference_client.stream({"op": "stream", "model": name, "input_text": input_text})
+        else:
+            pieces = stream_generation(name, input_text)
+        try:
+            # Wait for a stream slot before answering, so a full queue is a 503 rather than an error event
+            await anext(pieces)
+        except (QueueFullError, ConnectionError) as exc:
+            await pieces.aclose()
+            raise HTTPException(status_code=503, detail=str(exc), headers={"Retry-After": "1"})
+    return StreamingResponse(
+        stream_correction_events(name, input_text, key, correction, pieces), media_type="text/event-stream"
+    )
+
+@app.post("/mt5_paragraph/stream")
+async def mt5_paragraph_stream(input_data: SentenceInput):
+    # Stream the MT5 paragraph correction as it is decoded
+    return await stream_response("mt5_paragraph", input_data.input_text)
+
+@app.post("/bart_paragraph/stream")
+async def bart_paragraph_stream(input_data: SentenceInput):
+    # Stream the mBART paragraph correction as it is decoded
+    return await stream_response("bart_paragraph", input_data.input_text)
+
+class WarmupInput(BaseModel):
+    models: list[str] | None = None
+
+@app.post("/warmup")
+async def warmup(input_data: WarmupInput):
+    # Load models ahead of traffic (all enabled models by default)
+    names = input_data.models or enabled_models
+    unknown = [name for name in names if name not in model_registry]
+    if unknown:
+        raise HTTPException(status_code=404, detail=f"Models not enabled on this server: {', '.join(unknown)}")
+    if inference_client is not None:
+        models = (await inference_request({"op": "warmup", "models": names}))["models"]
+        remote_model_stats.update(models)
+        return models
+    await asyncio.get_running_loop().run_in_executor(inference_executor, model_registry.warmup, names)
+    return model_registry.stats()
+
+async def unload_idle_models():
+    # Check a few times per TTL so idle models are released soon after they expire
+    while True:
+        await asyncio.sleep(max(1.0, model_registry.idle_ttl / 4))
+        unloaded = await asyncio.to_thread(model_registry.unload_idle)
+        if unloaded:
+            logger.info("Unloaded idle models: %s", ", ".join(unloaded))
+
+@app.on_event("startup")
+async def start_model_registry():
+    if inference_client is not None:
+        # Models are loaded and unloaded by the inference process
+        return
+    warmup_models = [name.strip() for name in os.environ.get("WARMUP_MODELS", "").split(",") if name.strip()]
+    if warmup_models:
+        await asyncio.get_running_loop().run_in_executor(inference_executor, model_registry.warmup, warmup_models)
+    if model_registry.idle_ttl:
+        asyncio.get_running_loop().create_task(unload_idle_models())
+
+@app.post("/lexicon/reload")
+async def reload_lexicon():
+    # Recompile the error lexicon from LEXICON_DIR and switch this worker to it; other workers follow
+    # within LEXICON_RELOAD_SECONDS. Invalid dictionary files leave the current lexicon in place.
+    try:
+        changed = await asyncio.to_thread(refresh_lexicon, True)
+    except LexiconError as exc:
+        raise HTTPException(status_code=422, detail=str(exc))
+    return dict(error_lexicon.stats(), changed=changed)
+
+async def watch_lexicon():
+    while True:
+        await asyncio.sleep(lexicon_reload_seconds)
+        try:
+            await asyncio.to_thread(refresh_lexicon)
+        except LexiconError as exc:
+            logger.error("Keeping error lexicon %s, the changed dictionaries are invalid: %s", error_lexicon.checksum, exc)
+
+@app.on_event("startup")
+async def start_lexicon_watcher():
+    if lexicon_reload_seconds > 0:
+        asyncio.get_running_loop().create_task(watch_lexicon())
+
+@app.middleware("http")
+async def record_request_metrics(request: Request, call_next):
+    start = time.perf_counter()
+    response = await call_next(request)
+    # Label by route template so unknown paths do not create new series
+    route = request.scope.get("route")
+    endpoint = route.path if route is not None else "unmatched"
+    metrics.observe("urdu_correct_request_seconds", time.perf_counter() - start, endpoint=endpoint)
+    metrics.inc("urdu_correct_requests_total", endpoint=endpoint, status=response.status_code)
+    return response
+
+def model_stats():
+    # HTTP workers report the inference process's models as of its latest generate, stream, warmup or stats reply
+    return dict(remote_model_stats) if inference_client is not None else model_registry.stats()
+
+def collect_service_stats():
+    """Expose registry, batching and cache stats as gauges when /metrics is scraped."""
+    models = model_stats()
+    batching = {name: batcher.stats() for name, batcher in batchers.items()}
+    cache = correction_cache.stats()
+    return [
+        ("urdu_correct_model_loaded", "gauge", "Whether the model is currently loaded.",
+         [({"model": name}, int(stats["loaded"])) for name, stats in models.items()]),
+        ("urdu_correct_model_load_seconds", "gauge", "Duration of the model's last load.",
+         [({"model": name}, stats["last_load_seconds"]) for name, stats in models.items()]),
+        ("urdu_correct_model_loads_total", "counter", "Model loads since startup.",
+         [({"model": name}, stats["loads"]) for name, stats in models.items()]),
+        ("urdu_correct_queue_depth", "gauge", "Requests waiting in the model's batching queue.",
+         [({"model": name}, stats["queue_depth"]) for name, stats in batching.items()]),
+        ("urdu_correct_batches_total", "counter", "Batches run by the model's micro-batcher.",
+         [({"model": name}, stats["batches"]) for name, stats in batching.items()]),
+        ("urdu_correct_batched_requests_total", "counter", "Texts run through the model's micro-batcher.",
+         [({"model": name}, stats["requests"]) for name, stats in batching.items()]),
+        ("urdu_correct_queue_wait_seconds_avg", "gauge", "Mean time texts waited in the batching queue.",
+         [({"model": name}, stats["avg_queue_wait_ms"] / 1000) for name, stats in batching.items()]),
+        ("urdu_correct_queue_rejected_total", "counter", "Requests rejected because the queue was full.",
+         [({"model": name}, stats["rejected"]) for name, stats in batching.items()]),
+        ("urdu_correct_cache_entries", "gauge", "Entries in the in-memory correction cache.",
+         [({}, cache["entries"])]),
+        ("urdu_correct_cache_hits_total", "counter", "Correction cache hits.", [({}, cache["hits"])]),
+        ("urdu_correct_cache_misses_total", "counter", "Correction cache misses.", [({}, cache["misses"])]),
+        ("urdu_correct_cache_coalesced_total", "counter", "Misses that waited on an identical in-flight correction.",
+         [({}, cache["coalesced"])]),
+        ("urdu_correct_lexicon_entries", "gauge", "Entries in the loaded error lexicon, by checksum.",
+         [({"checksum": error_lexicon.checksum}, error_lexicon.entry_count)]),
+    ]
+
+metrics.add_collector(collect_service_stats)
+
+@app.get("/metrics")
+async def metrics_endpoint():
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
+@app.get("/stats")
+async def stats():
+    if inference_client is not None:
+        inference = await inference_request({"op": "stats"})
+        models, batching, streams = inference["models"], inference["batching"], inference["streams"]
+        remote_model_stats.update(models)
+    else:
+        models, batching = model_registry.stats(), {name: batcher.stats() for name, batcher in batchers.items()}
+        streams = {name: slots.stats() for name, slots in stream_slots.items()}
+    return {
+        "models": models,
+        "batching": batching,
+        "streams": streams,
+        "cache": correction_cache.stats(),
+        "prescreen": prescreen.stats(),
+        "lexicon": error_lexicon.stats()
     }
@@ -0,0 +1,58 @@
+import re
+import unicodedata
+
+# Punctuation stripped from words before the dictionary lookup, so "لوک۔" is screened like "لوک"
+WORD_PUNCTUATION = "۔؟!،؛,.?;:\"'()[]"
+
+
+class Prescreen:
+    """
+    Decides whether a text can skip generation. A text is treated as clean when none of
+    its words matches an incorrect dictionary stem (plus suffixes) and it is no longer than
+    `max_words`; dictionaries listed in `ignore_dicts` (e.g. ones whose "incorrect" words are
+    common function words) do not count as matches.
+    """
+
+    def __init__(self, lookup, enabled=False, max_words=20, ignore_dicts=()):
+        self.lookup = lookup
+        self.enabled = enabled
+        self.max_words = max_words
+        self.ignore_dicts = set(ignore_dicts)
+        self.skipped = 0
+        self.screened = 0
+
+    def suspicious_words(self, text):
+        """Return the words of text that match an entry in the error dictionaries."""
+        suspicious = []
+        for word in re.findall(r'\S+', unicodedata.normalize('NFC', text)):
+            stem = word.strip(WORD_PUNCTUATION)
+            if stem and any(entry[2] not in self.ignore_dicts for entry in self.lookup(stem)):
+                suspicious.append(word)
+        return suspicious
+
+    def is_clean(self, text):
+        """Apply the clean-text heuristic regardless of whether the pre-screen is enabled."""
+        words = re.findall(r'\S+', text)
+        if self.max_words and len(words) > self.max_words:
+            return False
+        return not self.suspicious_words(text)
+
+    def should_skip(self, text):
+        """Check an incoming text, counting how often generation is skipped."""
+        if not self.enabled:
+            return False
+        self.screened += 1
+        if self.is_clean(text):
+            self.skipped += 1
+            return True
+        return False
+
+    def stats(self):
+        return {
+            "enabled": self.enabled,
+            "max_words": self.max_words,
+            "ignore_dicts": sorted(self.ignore_dicts),
+            "screened": self.screened,
+            "skipped": self.skipped,
+            "skip_rate": self.skipped / self.screened if self.screened else 0.0,
+        }
@@ -0,0 +1,68 @@
+"""
+Measure the skip-generation pre-screen against real model outputs.
+Every text is run through the model; a skip counts as correct when the model would have
+left the words unchanged. Reports how often the pre-screen fires, its precision and how
+many of the unchanged texts it catches.
+
+Usage: python prescreen_eval.py --input FILE [--model mt5_sentence] [--max-words 20] [--ignore-dicts a,b]
+FILE holds one text per line, or JSON lines with an "input_text" field.
+"""
+import argparse
+import json
+
+import main
+from prescreen import Prescreen
+
+
+def read_texts(path):
+    texts = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            if line.startswith("{"):
+                line = json.loads(line)["input_text"]
+            texts.append(line)
+    return texts
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--input", required=True)
+    parser.add_argument("--model", choices=list(main.MODEL_LOADERS), default="mt5_sentence")
+    parser.add_argument("--max-words", type=int, default=main.prescreen.max_words)
+    parser.add_argument("--ignore-dicts", default=",".join(sorted(main.prescreen.ignore_dicts)))
+    parser.add_argument("--batch-size", type=int, default=8)
+    args = parser.parse_args()
+
+    screen = Prescreen(
+        main.lookup_error_entries,
+        enabled=True,
+        max_words=args.max_words,
+        ignore_dicts=[name for name in args.ignore_dicts.split(",") if name],
+    )
+    texts = read_texts(args.input)
+    tokenizer, model, decoder_start_id = main.MODEL_LOADERS[args.model]()
+
+    corrections = []
+    for start in range(0, len(texts), args.batch_size):
+        corrections.extend(main.generate_corrections(
+            tokenizer, model, texts[start:start + args.batch_size], decoder_start_id=decoder_start_id
+        ))
+
+    fired = [screen.is_clean(text) for text in texts]
+    unchanged = [main.same_words(text, corrected) for text, corrected in zip(texts, corrections)]
+    true_skips = sum(f and u for f, u in zip(fired, unchanged))
+
+    print(f"{args.model}: {len(texts)} texts, model left {sum(unchanged)} unchanged")
+    print(f"  pre-screen fired: {sum(fired)} ({sum(fired) / len(texts):.1%})")
+    print(f"  precision (skipped and unchanged / skipped): {true_skips / sum(fired) if any(fired) else 0.0:.1%}")
+    print(f"  unchanged texts caught: {true_skips / sum(unchanged) if any(unchanged) else 0.0:.1%}")
+    false_skips = [(text, corrected) for text, corrected, f, u in zip(texts, corrections, fired, unchanged) if f and not u]
+    for text, corrected in false_skips[:20]:
+        print(f"  - skipped but the model changed it:\n      input: {text}\n      model: {corrected}")
+
+
+if __name__ == "__main__":
+    main_cli()
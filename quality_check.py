@@ -0,0 +1,65 @@
+"""
+Compare a quantized or bf16 inference backend against fp32 on a fixed Urdu test set.
+For each model, reports how often the corrected text and the detect_errors result
+match the fp32 output, and the mean generation latency of both backends.
+
+Usage: python quality_check.py --backend int8 [--models mt5_sentence bart_paragraph] [--input FILE]
+"""
+import argparse
+import copy
+import os
+import time
+
+# The reference outputs must come from fp32 models, whatever the deployment configures
+for variable in ("MT5_PARAGRAPH_BACKEND", "MT5_SENTENCE_BACKEND", "BART_PARAGRAPH_BACKEND"):
+    os.environ[variable] = "fp32"
+
+import main
+from backends import BACKENDS, apply_backend
+
+
+def run(tokenizer, model, texts, decoder_start_id):
+    """Correct each text on its own and return (corrections, errors, mean latency in seconds)."""
+    corrections = []
+    errors = []
+    start = time.perf_counter()
+    for text in texts:
+        corrections.extend(main.generate_corrections(tokenizer, model, [text], decoder_start_id=decoder_start_id))
+    elapsed = time.perf_counter() - start
+    for text, corrected_text in zip(texts, corrections):
+        errors.append(main.detect_errors(text, corrected_text))
+    return corrections, errors, elapsed / len(texts)
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--backend", choices=[b for b in BACKENDS if b != "fp32"], required=True)
+    parser.add_argument("--models", nargs="+", choices=list(main.MODEL_LOADERS), default=list(main.MODEL_LOADERS))
+    parser.add_argument("--input", default=os.path.join(os.path.dirname(os.path.abspath(__file__)), "quality_check_sentences.txt"))
+    args = parser.parse_args()
+
+    with open(args.input, encoding="utf-8") as f:
+        texts = [line.strip() for line in f if line.strip()]
+
+    for name in args.models:
+        tokenizer, reference_model, decoder_start_id = main.MODEL_LOADERS[name]()
+        candidate_model = apply_backend(copy.deepcopy(reference_model), args.backend)
+
+        reference_text, reference_errors, reference_latency = run(tokenizer, reference_model, texts, decoder_start_id)
+        candidate_text, candidate_errors, candidate_latency = run(tokenizer, candidate_model, texts, decoder_start_id)
+
+        text_matches = sum(a == b for a, b in zip(reference_text, candidate_text))
+        error_matches = sum(a == b for a, b in zip(reference_errors, candidate_errors))
+        print(f"\n{name}: fp32 vs {args.backend} on {len(texts)} texts")
+        print(f"  corrected_text identical: {text_matches}/{len(texts)}")
+        print(f"  errors identical:         {error_matches}/{len(texts)}")
+        print(f"  mean latency: fp32 {reference_latency * 1000:.1f} ms, {args.backend} {candidate_latency * 1000:.1f} ms")
+        for text, a, b in zip(texts, reference_text, candidate_text):
+            if a != b:
+                print(f"  - {text}\n      fp32: {a}\n      {args.backend}: {b}")
+
+        del candidate_model, reference_model
+
+
+if __name__ == "__main__":
+    main_cli()
@@ -0,0 +1,101 @@
+import gc
+import threading
+import time
+from collections import namedtuple
+from contextlib import contextmanager
+
+LoadedModel = namedtuple("LoadedModel", ["tokenizer", "model", "decoder_start_id"])
+
+
+class ModelRegistry:
+    """
+    Loads models on first use (or on warmup) instead of at import time.
+    Each model has its own lock so concurrent first requests trigger a single load, and
+    models that have not been used for `idle_ttl` seconds can be unloaded to free memory.
+    Loading blocks, so callers on the event loop should go through an executor.
+    """
+
+    def __init__(self, idle_ttl=0):
+        self.idle_ttl = idle_ttl
+        self.loaders = {}
+        self.loaded = {}
+        self.locks = {}
+        self.in_use = {}
+        self.last_used = {}
+        self.load_seconds = {}
+        self.load_count = {}
+        self.unload_count = {}
+
+    def register(self, name, loader):
+        """Register a loader returning a LoadedModel; nothing is loaded yet."""
+        self.loaders[name] = loader
+        self.locks[name] = threading.Lock()
+        self.in_use[name] = 0
+        self.load_count[name] = 0
+        self.unload_count[name] = 0
+
+    def __contains__(self, name):
+        return name in self.loaders
+
+    def acquire(self, name):
+        """Return the loaded model, loading it first if needed, and mark it in use."""
+        with self.locks[name]:
+            if name not in self.loaded:
+                start = time.perf_counter()
+                self.loaded[name] = self.loaders[name]()
+                self.load_seconds[name] = time.perf_counter() - start
+                self.load_count[name] += 1
+            self.in_use[name] += 1
+            self.last_used[name] = time.monotonic()
+            return self.loaded[name]
+
+    def release(self, name):
+        with self.locks[name]:
+            self.in_use[name] -= 1
+            self.last_used[name] = time.monotonic()
+
+    @contextmanager
+    def use(self, name):
+        """Context manager around acquire/release."""
+        loaded = self.acquire(name)
+        try:
+            yield loaded
+        finally:
+            self.release(name)
+
+    def warmup(self, names=None):
+        """Load the given models (all registered ones by default) ahead of the first request."""
+        for name in names or list(self.loaders):
+            self.acquire(name)
+            self.release(name)
+
+    def unload_idle(self):
+        """Unload models that are not in use and have been idle longer than idle_ttl. Returns their names."""
+        if not self.idle_ttl:
+            return []
+        now = time.monotonic()
+        unloaded = []
+        for name in list(self.loaded):
+            with self.locks[name]:
+                if name in self.loaded and self.in_use[name] == 0 and now - self.last_used[name] > self.idle_ttl:
+                    del self.loaded[name]
+                    self.unload_count[name] += 1
+                    unloaded.append(name)
+        if unloaded:
+            gc.collect()
+        return unloaded
+
+    def stats(self):
+        """Return load state, last load time and load/unload counts per model."""
+        now = time.monotonic()
+        return {
+            name: {
+                "loaded": name in self.loaded,
+                "in_use": self.in_use[name],
+                "idle_seconds": now - self.last_used[name] if name in self.last_used else None,
+                "last_load_seconds": self.load_seconds.get(name),
+                "loads": self.load_count[name],
+                "unloads": self.unload_count[name],
+            }
+            for name in self.loaders
+        }
@@ -0,0 +1,186 @@
+import asyncio
+import inspect
+import itertools
+import json
+import os
+
+from batching import QueueFullError
+
+# Largest message line; a /batch request of long paragraphs is well within this
+MESSAGE_LIMIT = 64 * 1024 * 1024
+
+
+class InferenceError(RuntimeError):
+    """Raised in an HTTP worker when the inference process failed to serve a request."""
+
+
+def _encode(message):
+    return (json.dumps(message, ensure_ascii=False) + "\n").encode("utf-8")
+
+
+class InferenceClient:
+    """
+    Connection from an HTTP worker to the inference process over its Unix socket.
+    Messages are JSON lines; one connection per worker carries all in-flight requests,
+    and replies are routed back to their request by id. The connection is opened on first
+    use and reopened after it drops; requests in flight when it drops fail with ConnectionError.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.ids = itertools.count(1)
+        self.replies = {}  # request id -> queue of reply messages
+        self.writer = None
+        self.reader_task = None
+        self.connect_lock = None
+
+    async def _connect(self):
+        if self.connect_lock is None:
+            self.connect_lock = asyncio.Lock()
+        async with self.connect_lock:
+            if self.writer is not None and not self.writer.is_closing():
+                return
+            try:
+                reader, self.writer = await asyncio.open_unix_connection(self.path, limit=MESSAGE_LIMIT)
+            except OSError as exc:
+                raise ConnectionError(f"inference process unavailable at {self.path}: {exc}") from exc
+            self.reader_task = asyncio.get_running_loop().create_task(self._read(reader, self.writer))
+
+    async def _read(self, reader, writer):
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                message = json.loads(line)
+                queue = self.replies.get(message["id"])
+                if queue is not None:
+                    queue.put_nowait(message)
+        finally:
+            writer.close()
+            for queue in self.replies.values():
+                queue.put_nowait(None)
+
+    async def _send(self, message):
+        await self._connect()
+        request_id = next(self.ids)
+        queue = asyncio.Queue()
+        self.replies[request_id] = queue
+        self.writer.write(_encode(dict(message, id=request_id)))
+        await self.writer.drain()
+        return request_id, queue
+
+    @staticmethod
+    def _check(reply):
+        if reply is None:
+            raise ConnectionError("connection to the inference process was lost")
+        if reply.get("error") == "queue_full":
+            raise QueueFullError(reply["detail"])
+        if "error" in reply:
+            raise InferenceError(reply["detail"])
+        return reply
+
+    async def request(self, message):
+        """Send one request and return its reply."""
+        request_id, queue = await self._send(message)
+        try:
+            return self._check(await queue.get())
+        finally:
+            del self.replies[request_id]
+
+    async def stream(self, message):
+        """Send a streaming request and yield its replies up to and including the final one (with "done")."""
+        request_id, queue = await self._send(message)
+        try:
+            while True:
+                reply = self._check(await queue.get())
+                yield reply
+                if "done" in reply:
+                    return
+        finally:
+            del self.replies[request_id]
+
+
+class RemoteBatcher:
+    """
+    Stands in for a model's MicroBatcher in an HTTP worker. Items go to the inference process,
+    whose own batcher groups them with the other workers' requests. `stats` returns the batcher
+    stats the inference process sent with its latest reply; `on_reply` sees every reply.
+    """
+
+    def __init__(self, name, client, on_reply=None):
+        self.name = name
+        self.client = client
+        self.on_reply = on_reply
+        self.last_stats = {
+            "batches": 0, "requests": 0, "avg_queue_wait_ms": 0.0, "queue_depth": 0, "rejected": 0,
+        }
+
+    async def submit(self, item):
+        results = await self.submit_many([item])
+        return results[0]
+
+    async def submit_many(self, items):
+        if not items:
+            return []
+        reply = await self.client.request({"op": "generate", "model": self.name, "items": [list(item) for item in items]})
+        self.last_stats = reply["batching"]
+        if self.on_reply is not None:
+            self.on_reply(self.name, reply)
+        return reply["results"]
+
+    def stats(self):
+        return dict(self.last_stats, remote=True)
+
+
+async def serve(path, handlers):
+    """
+    Serve requests on a Unix socket at `path`. `handlers` maps each op to an async function
+    taking the request message and returning the reply fields, or to an async generator whose
+    yielded dicts are sent as successive replies. QueueFullError is reported as "queue_full" so
+    workers can answer 503; other exceptions are reported as "failed".
+    """
+    if os.path.exists(path):
+        os.unlink(path)
+
+    async def handle(reader, writer):
+        write_lock = asyncio.Lock()
+        tasks = set()
+
+        async def reply(message):
+            async with write_lock:
+                writer.write(_encode(message))
+                await writer.drain()
+
+        async def respond(message):
+            request_id = message["id"]
+            try:
+                handler = handlers.get(message.get("op"))
+                if handler is None:
+                    raise ValueError(f"unknown op {message.get('op')!r}")
+                if inspect.isasyncgenfunction(handler):
+                    async for fields in handler(message):
+                        await reply(dict(fields, id=request_id))
+                else:
+                    await reply(dict(await handler(message), id=request_id))
+            except QueueFullError as exc:
+                await reply({"id": request_id, "error": "queue_full", "detail": str(exc)})
+            except (ConnectionError, asyncio.CancelledError):
+                raise
+            except Exception as exc:
+                await reply({"id": request_id, "error": "failed", "detail": f"{type(exc).__name__}: {exc}"})
+
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                task = asyncio.get_running_loop().create_task(respond(json.loads(line)))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+        finally:
+            for task in tasks:
+                task.cancel()
+            writer.close()
+
+    return await asyncio.start_unix_server(handle, path=path, limit=MESSAGE_LIMIT)
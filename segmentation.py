@@ -0,0 +1,34 @@
+import re
+
+# A sentence runs up to and including its terminators (Urdu full stop, Arabic question mark, !) or a newline
+SENTENCE_PATTERN = re.compile(r'[^\s۔؟!][^۔؟!\n]*[۔؟!]*')
+WORD_PATTERN = re.compile(r'\w')
+
+
+def sentence_spans(text):
+    """
+    Split text on Urdu sentence boundaries (۔ ؟ ! and newlines).
+    Returns (start, end) character spans of each sentence with surrounding whitespace excluded;
+    everything between spans is kept verbatim when the corrections are stitched back.
+    """
+    spans = []
+    for match in SENTENCE_PATTERN.finditer(text):
+        sentence = match.group()
+        # Punctuation-only fragments have nothing to correct
+        if not WORD_PATTERN.search(sentence):
+            continue
+        start = match.start()
+        spans.append((start, start + len(sentence.rstrip())))
+    return spans
+
+
+def stitch(text, spans, replacements):
+    """Replace each span of text with its replacement, keeping the text between spans unchanged."""
+    pieces = []
+    last = 0
+    for (start, end), replacement in zip(spans, replacements):
+        pieces.append(text[last:start])
+        pieces.append(replacement)
+        last = end
+    pieces.append(text[last:])
+    return "".join(pieces)
@@ -0,0 +1,61 @@
+"""
+Start the correction service.
+With WORKERS=1 (the default) this is the single uvicorn process as before. With more, the
+models are loaded once by inference_server.py and WORKERS uvicorn workers handle HTTP,
+forwarding generation to it over a Unix socket (INFERENCE_SOCKET), so memory stays at one
+copy of the weights however many workers run.
+
+Usage: WORKERS=4 python serve.py   (HOST and PORT default to 0.0.0.0 and 8000)
+"""
+import os
+import signal
+import subprocess
+import sys
+import time
+
+# How long the inference process may take to load its models before workers start anyway
+INFERENCE_START_TIMEOUT = float(os.environ.get("INFERENCE_START_TIMEOUT", "600"))
+
+
+def main_cli():
+    workers = int(os.environ.get("WORKERS", "1"))
+    uvicorn = ["uvicorn", "main:app", "--host", os.environ.get("HOST", "0.0.0.0"), "--port", os.environ.get("PORT", "8000")]
+    if workers <= 1:
+        os.execvp(uvicorn[0], uvicorn)
+
+    socket_path = os.environ.get("INFERENCE_SOCKET", "/tmp/urdu_correct_inference.sock")
+    if os.path.exists(socket_path):
+        os.unlink(socket_path)
+    inference = subprocess.Popen([sys.executable, "inference_server.py", "--socket", socket_path])
+
+    # The socket appears once the inference process has warmed up and is accepting requests
+    deadline = time.monotonic() + INFERENCE_START_TIMEOUT
+    while not os.path.exists(socket_path) and time.monotonic() < deadline:
+        if inference.poll() is not None:
+            sys.exit(inference.returncode)
+        time.sleep(0.2)
+
+    http = subprocess.Popen(uvicorn + ["--workers", str(workers)], env=dict(os.environ, INFERENCE_SOCKET=socket_path))
+
+    def stop(signum, frame):
+        for process in (http, inference):
+            if process.poll() is None:
+                process.send_signal(signal.SIGTERM)
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+
+    # If either side exits, take the other down too so the container restarts cleanly
+    while http.poll() is None and inference.poll() is None:
+        time.sleep(0.5)
+    stop(None, None)
+    for process in (http, inference):
+        try:
+            process.wait(timeout=30)
+        except subprocess.TimeoutExpired:
+            process.kill()
+    sys.exit(http.returncode or inference.returncode or 0)
+
+
+if __name__ == "__main__":
+    main_cli()
@@ -0,0 +1,28 @@
+import asyncio
+import json
+
+from transformers import TextStreamer
+
+
+class AsyncTextStreamer(TextStreamer):
+    """
+    Streamer for generate running in a worker thread. Decoded text is handed to an asyncio
+    queue on the serving loop as (text, stream_end) pairs, a word at a time.
+    """
+
+    def __init__(self, tokenizer, loop, **decode_kwargs):
+        super().__init__(tokenizer, skip_prompt=True, **decode_kwargs)
+        self.loop = loop
+        self.queue = asyncio.Queue()
+
+    def on_finalized_text(self, text, stream_end=False):
+        self.loop.call_soon_threadsafe(self.queue.put_nowait, (text, stream_end))
+
+    def abort(self):
+        """Unblock the consumer when generate fails before reaching the end of the stream."""
+        self.on_finalized_text("", stream_end=True)
+
+
+def sse_event(event, data):
+    """Format one Server-Sent Event with a JSON payload."""
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
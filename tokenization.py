@@ -0,0 +1,89 @@
+import threading
+import weakref
+from collections import OrderedDict
+
+import torch
+
+
+class PromptTokenizer:
+    """
+    Tokenizes `prefix + text` prompts without re-tokenizing the constant prefix.
+    The prefix is tokenized once; text token ids are memoized in an LRU so repeated
+    inputs skip the tokenizer, and misses in a batch go through one batched tokenizer call.
+    Only a weak reference to the tokenizer is kept, so the memo in prompt_tokenizer_for does
+    not keep an unloaded model's tokenizer alive.
+    """
+
+    def __init__(self, tokenizer, prefix, max_length=512, cache_size=4096):
+        self.tokenizer_ref = weakref.ref(tokenizer)
+        self.max_length = max_length
+        self.cache_size = cache_size
+        # The prefix's trailing space belongs to the first word of the text once they are joined
+        self.prefix_ids = tokenizer(prefix.rstrip(" "), add_special_tokens=False)["input_ids"]
+        self.special_count = len(tokenizer.build_inputs_with_special_tokens([]))
+        self.cache = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def tokenizer(self):
+        # Callers hold the tokenizer while they use its PromptTokenizer, so it is always alive here
+        return self.tokenizer_ref()
+
+    def text_ids(self, texts):
+        """Token ids (without special tokens) for each text, served from the memo where possible."""
+        ids = [None] * len(texts)
+        missing = {}
+        with self.lock:
+            for position, text in enumerate(texts):
+                cached = self.cache.get(text)
+                if cached is not None:
+                    self.cache.move_to_end(text)
+                    ids[position] = cached
+                    self.hits += 1
+                else:
+                    missing.setdefault(text, []).append(position)
+                    self.misses += 1
+
+        if missing:
+            encoded = self.tokenizer(list(missing), add_special_tokens=False)["input_ids"]
+            with self.lock:
+                for (text, positions), text_ids in zip(missing.items(), encoded):
+                    for position in positions:
+                        ids[position] = text_ids
+                    if self.cache_size:
+                        self.cache[text] = text_ids
+                        while len(self.cache) > self.cache_size:
+                            self.cache.popitem(last=False)
+        return ids
+
+    def __call__(self, texts):
+        """Build padded input_ids and attention_mask tensors for the prompts of `texts`."""
+        room = self.max_length - self.special_count
+        rows = [
+            self.tokenizer.build_inputs_with_special_tokens((self.prefix_ids + text_ids)[:room])
+            for text_ids in self.text_ids(texts)
+        ]
+        width = max(len(row) for row in rows)
+        pad_id = self.tokenizer.pad_token_id
+        input_ids = torch.full((len(rows), width), pad_id, dtype=torch.long)
+        attention_mask = torch.zeros((len(rows), width), dtype=torch.long)
+        for position, row in enumerate(rows):
+            input_ids[position, :len(row)] = torch.tensor(row, dtype=torch.long)
+            attention_mask[position, :len(row)] = 1
+        return {"input_ids": input_ids, "attention_mask": attention_mask}
+
+
+_prompt_tokenizers = weakref.WeakKeyDictionary()
+_prompt_tokenizers_lock = threading.Lock()
+
+
+def prompt_tokenizer_for(tokenizer, prefix, max_length=512, cache_size=4096):
+    """Return the PromptTokenizer for a tokenizer, creating it on first use. It goes away with the tokenizer."""
+    with _prompt_tokenizers_lock:
+        prompt_tokenizer = _prompt_tokenizers.get(tokenizer)
+        if prompt_tokenizer is None:
+            prompt_tokenizer = PromptTokenizer(tokenizer, prefix, max_length=max_length, cache_size=cache_size)
+            _prompt_tokenizers[tokenizer] = prompt_tokenizer
+        return prompt_tokenizer